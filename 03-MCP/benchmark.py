@@ -0,0 +1,264 @@
+"""Benchmarks for the search_docs pipeline.
+
+Run from a directory holding the zip archives to search, for example:
+
+    uv run python benchmark.py payload --limit 5
+
+payload: compares the JSON size of search_docs responses when whole files
+are returned (one document per file) with the size when passages are
+returned (one document per chunk).
+
+ingest: writes a synthetic archive of --size-mb (split into --archives zip
+files), then indexes it in a fresh process per pipeline and reports wall
+time and peak RSS:
+
+    uv run python benchmark.py ingest --size-mb 100 --archives 4
+
+- eager: every file read into one list, then chunked, then indexed (the
+  previous pipeline),
+- streaming: IndexRegistry with one worker: files streamed through the
+  chunker, one archive after another, each index saved next to its archive,
+- pool: the same with one process per archive (peak RSS is then the largest
+  of the server process and the workers).
+
+search: indexes the passages of every archive with each search backend and
+reports index build time and per-query latency (scoring plus top-k), next to
+minsearch's own ``Index.search``; "top-k overlap" is the share of each
+backend's results that ``Index.search`` also returns:
+
+    uv run python benchmark.py search --repeat 20 --boosts filename=2
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+from pathlib import Path
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+import zipfile
+
+import numpy as np
+
+from search import (
+    BACKENDS,
+    IndexRegistry,
+    backend_class,
+    build_index,
+    chunk_documents,
+    load_archive_index,
+    load_documents,
+    parse_boosts,
+    search,
+    search_archives,
+    top_k,
+)
+
+DEFAULT_QUERIES = [
+    "how do I create a server",
+    "add a tool",
+    "resource templates",
+    "prompts",
+    "authentication bearer token",
+    "client transport",
+    "context logging progress",
+    "deploy http",
+]
+
+
+def payload_bytes(results: list[dict[str, str]]) -> int:
+    return len(json.dumps(results, ensure_ascii=False).encode("utf-8"))
+
+
+def run_payload(args: argparse.Namespace) -> None:
+    workdir = Path(args.workdir)
+    docs = load_documents(workdir)
+    files = build_index(docs)
+    started = time.perf_counter()
+    passages = [load_archive_index(zip_path)[0] for zip_path in sorted(workdir.glob("*.zip"))]
+    print(
+        f"{len(docs)} files, {len(chunk_documents(docs))} passages "
+        f"(indexes ready in {time.perf_counter() - started:.2f}s)"
+    )
+    print(f"{'query':<32} {'files':>10} {'passages':>10}")
+    total_files = total_passages = 0
+    for query in args.queries or DEFAULT_QUERIES:
+        file_size = payload_bytes(search(files, query, limit=args.limit))
+        passage_size = payload_bytes(search_archives(passages, query, limit=args.limit))
+        total_files += file_size
+        total_passages += passage_size
+        print(f"{query[:32]:<32} {file_size:>10,} {passage_size:>10,}")
+    ratio = total_files / total_passages if total_passages else float("inf")
+    print(f"{'total bytes':<32} {total_files:>10,} {total_passages:>10,}  ({ratio:.1f}x smaller)")
+
+
+def write_synthetic_archives(workdir: Path, size_mb: float, archives: int, markdown_share: float) -> None:
+    """Write ``archives`` zip files totalling about ``size_mb`` MB, like a docs repository.
+
+    ``markdown_share`` of the bytes are markdown pages (words from a Zipf-like
+    vocabulary, so they compress like prose); the rest are stored binary
+    assets, which ingestion has to skip.
+    """
+    rng = random.Random(0)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))) for _ in range(20_000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    per_archive = size_mb * 1_000_000 / archives
+    for number in range(archives):
+        markdown_bytes = asset_bytes = 0  # compressed bytes written so far
+        with zipfile.ZipFile(workdir / f"synthetic-{number}.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+            for page in itertools.count():
+                if markdown_bytes + asset_bytes >= per_archive:
+                    break
+                if markdown_bytes <= markdown_share * (markdown_bytes + asset_bytes):
+                    sections = []
+                    for section in range(rng.randint(2, 10)):
+                        words = rng.choices(vocabulary, weights, k=rng.randint(80, 600))
+                        sections.append(f"## Section {section} {words[0]}\n\n" + " ".join(words))
+                    text = f"# Page {page}\n\n" + "\n\n".join(sections)
+                    archive.writestr(f"synthetic-main/docs/{page // 100}/page{page}.md", text)
+                    markdown_bytes += archive.infolist()[-1].compress_size
+                else:
+                    blob = rng.randbytes(rng.randint(50_000, 500_000))
+                    archive.writestr(f"synthetic-main/assets/image{page}.png", blob, compress_type=zipfile.ZIP_STORED)
+                    asset_bytes += len(blob)
+
+
+def run_ingest_once(args: argparse.Namespace) -> None:
+    workdir = Path(args.workdir)
+    zip_paths = sorted(workdir.glob("*.zip"))
+    started = time.perf_counter()
+    if args.pipeline == "eager":
+        docs = []
+        for zip_path in zip_paths:
+            docs.extend(list(iter_markdown_eagerly(zip_path)))
+        indexes = [build_index(chunk_documents(docs))]
+    else:
+        workers = 1 if args.pipeline == "streaming" else len(zip_paths)
+        indexes = [archive.index for archive in IndexRegistry(workdir, workers=workers).archives()]
+    elapsed = time.perf_counter() - started
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "passages": sum(len(index.docs) for index in indexes),
+                "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "children_maxrss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+            }
+        )
+    )
+
+
+def iter_markdown_eagerly(zip_path: Path) -> list[dict[str, str]]:
+    """The previous reader: every markdown file of the archive in one list."""
+    docs = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for name in archive.namelist():
+            if name.lower().endswith((".md", ".mdx")):
+                docs.append({"filename": name.split("/", 1)[-1], "content": archive.read(name).decode("utf-8", errors="replace")})
+    return docs
+
+
+def run_ingest(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(args.workdir or tmp)
+        if not any(workdir.glob("*.zip")):
+            started = time.perf_counter()
+            write_synthetic_archives(workdir, args.size_mb, args.archives, args.markdown_share)
+            print(f"wrote synthetic archives in {time.perf_counter() - started:.1f}s")
+        zip_paths = sorted(workdir.glob("*.zip"))
+        size = sum(path.stat().st_size for path in zip_paths)
+        print(f"{len(zip_paths)} archive(s), {size / 1e6:.1f} MB, {os.cpu_count()} CPU(s)")
+        print(f"{'pipeline':<10} {'wall s':>8} {'peak RSS MB':>12} {'passages':>10}")
+        for pipeline in args.pipelines:
+            for saved in workdir.glob("*.index.pkl"):
+                saved.unlink()
+            output = subprocess.run(
+                [sys.executable, __file__, "ingest-once", pipeline, "--workdir", str(workdir)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            peak = max(result["maxrss_mb"], result["children_maxrss_mb"]) if pipeline == "pool" else result["maxrss_mb"]
+            print(f"{pipeline:<10} {result['seconds']:>8.1f} {peak:>12,.0f} {result['passages']:>10,}")
+
+
+def run_search(args: argparse.Namespace) -> None:
+    workdir = Path(args.workdir)
+    started = time.perf_counter()
+    passages = chunk_documents(load_documents(workdir))
+    print(f"{len(passages):,} passages (read and chunked in {time.perf_counter() - started:.2f}s)")
+    queries = args.queries or DEFAULT_QUERIES
+    boosts = parse_boosts(args.boosts)
+
+    def library_search(index, query: str) -> list[int]:
+        return [doc["_id"] for doc in index.search(query, num_results=args.limit, boost_dict=boosts, output_ids=True)]
+
+    def backend_search(index, query: str) -> list[int]:
+        return top_k(index.score(query, boosts), args.limit).tolist()
+
+    engines: list[tuple[str, Callable, Callable]] = [("Index.search", build_index, library_search)]
+    engines.extend((name, lambda docs, name=name: backend_class(name)().fit(docs), backend_search) for name in args.backends)
+
+    print(f"{'engine':<14} {'build s':>8} {'median ms':>10} {'p95 ms':>8} {'top-k overlap':>14}")
+    expected: list[set[int]] = []
+    for name, build, run in engines:
+        started = time.perf_counter()
+        index = build(passages)
+        build_seconds = time.perf_counter() - started
+        latencies = []
+        for _ in range(args.repeat):
+            for query in queries:
+                started = time.perf_counter()
+                run(index, query)
+                latencies.append(time.perf_counter() - started)
+        found = [set(run(index, query)) for query in queries]
+        expected = expected or found
+        overlap = sum(len(got & want) for got, want in zip(found, expected)) / max(sum(len(want) for want in expected), 1)
+        median, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"{name:<14} {build_seconds:>8.2f} {median:>10.2f} {p95:>8.2f} {overlap:>14.0%}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    payload = commands.add_parser("payload", help="response size of whole files vs passages")
+    payload.add_argument("queries", nargs="*")
+    payload.add_argument("--workdir", default=".")
+    payload.add_argument("--limit", type=int, default=5)
+    payload.set_defaults(handler=run_payload)
+
+    ingest = commands.add_parser("ingest", help="wall time and peak RSS of index builds")
+    ingest.add_argument("--workdir", help="directory with zip archives; synthetic ones are written if it has none")
+    ingest.add_argument("--size-mb", type=float, default=100)
+    ingest.add_argument("--archives", type=int, default=4)
+    ingest.add_argument("--markdown-share", type=float, default=0.3)
+    ingest.add_argument("--pipelines", nargs="+", default=["eager", "streaming", "pool"])
+    ingest.set_defaults(handler=run_ingest)
+
+    search_command = commands.add_parser("search", help="index build time and query latency per search backend")
+    search_command.add_argument("queries", nargs="*")
+    search_command.add_argument("--workdir", default=".")
+    search_command.add_argument("--limit", type=int, default=5)
+    search_command.add_argument("--repeat", type=int, default=10)
+    search_command.add_argument("--boosts", default="", help='field boosts such as "filename=2,section=1.5"')
+    search_command.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    search_command.set_defaults(handler=run_search)
+
+    once = commands.add_parser("ingest-once", help=argparse.SUPPRESS)
+    once.add_argument("pipeline", choices=["eager", "streaming", "pool"])
+    once.add_argument("--workdir", required=True)
+    once.set_defaults(handler=run_ingest_once)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    args.handler(args)
@@ -1,12 +1,28 @@
+import os
 from pathlib import Path
+import threading
+from typing import Any
 
 import requests
 from fastmcp import FastMCP
 
-from search import build_index, download_fastmcp_zip, load_documents, search as search_index
+from search import (
+    FASTMCP_ZIP_NAME,
+    ArchiveIndex,
+    IndexRegistry,
+    download_fastmcp_zip,
+    parse_boosts,
+    search_archives,
+)
+
+# "minsearch" (TF-IDF) or "bm25"; field boosts are written like "filename=2,section=1.5".
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "minsearch")
+SEARCH_BOOSTS = parse_boosts(os.getenv("SEARCH_BOOSTS", ""))
 
 mcp = FastMCP("Demo 🚀")
 
+index_registry = IndexRegistry(Path.cwd(), backend=SEARCH_BACKEND)
+
 @mcp.tool
 def add(a: int, b: int) -> int:
     """Add two numbers"""
@@ -29,11 +45,26 @@ def _fetch_markdown_impl(url: str, timeout_s: int = 10) -> str:
 
 @mcp.tool
 def search_docs(query: str, limit: int = 5) -> list[dict[str, str]]:
-    """Search markdown/mdx docs from local zip archives using minsearch."""
-    download_fastmcp_zip(Path.cwd() / "fastmcp-main.zip")
-    docs = load_documents(Path.cwd())
-    index = build_index(docs)
-    return search_index(index, query, limit=limit)
+    """Search markdown/mdx docs from local zip archives and return the best matching passages.
+
+    Each result has the file's ``filename``, the ``section`` heading and its ``anchor``,
+    and the passage ``content``.
+    """
+    return search_archives(_load_archives(), query, limit=limit, boosts=SEARCH_BOOSTS)
+
+
+@mcp.tool
+def index_stats() -> dict[str, Any]:
+    """Report the search index cache: backend, archives indexed, hit rate and build time."""
+    return index_registry.stats()
+
+
+def _load_archives() -> list[ArchiveIndex]:
+    download_fastmcp_zip(Path.cwd() / FASTMCP_ZIP_NAME)
+    return index_registry.archives()
+
 
 if __name__ == "__main__":
+    # Load (or build) the indexes while the server starts instead of on the first search.
+    threading.Thread(target=_load_archives, daemon=True).start()
     mcp.run()
@@ -1,14 +1,45 @@
 from __future__ import annotations
 
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import itertools
+import multiprocessing
+import os
 from pathlib import Path
+import pickle
+import re
+import threading
+import time
+from typing import Any, ClassVar, Iterable, Iterator, Mapping, Protocol
 import zipfile
 import urllib.request
 
+import numpy as np
 from minsearch import Index
+from scipy import sparse
 
 
 FASTMCP_ZIP_URL = "https://github.com/jlowin/fastmcp/archive/refs/heads/main.zip"
 FASTMCP_ZIP_NAME = "fastmcp-main.zip"
+# Saved next to each archive as <name>.zip.index.pkl; bump when its contents change shape.
+INDEX_SUFFIX = ".index.pkl"
+INDEX_FORMAT = 3
+# Passages are cut at headings, and sections longer than CHUNK_MAX_TOKENS
+# whitespace-separated tokens are split into overlapping windows.
+CHUNK_MAX_TOKENS = 300
+CHUNK_OVERLAP_TOKENS = 50
+
+HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE = re.compile(r"^\s*(```|~~~)")
+TOKEN = re.compile(r"\S+")
+
+TEXT_FIELDS = ("content", "filename", "section")
+# Words of two or more characters, lowercased: the same terms minsearch indexes.
+TERM = re.compile(r"(?u)\b\w\w+\b")
+BM25_K1 = 1.2
+BM25_B = 0.75
 
 
 def download_fastmcp_zip(zip_path: Path) -> None:
@@ -23,46 +54,471 @@ def strip_first_path_component(path: str) -> str:
     return parts[1] if len(parts) > 1 else parts[0]
 
 
-def iter_markdown_from_zip(zip_path: Path) -> list[dict[str, str]]:
-    docs: list[dict[str, str]] = []
+def iter_markdown_from_zip(zip_path: Path) -> Iterator[dict[str, str]]:
+    """Yield the archive's markdown files one at a time, decompressing each only when it is reached."""
     try:
         with zipfile.ZipFile(zip_path) as archive:
-            for name in archive.namelist():
-                if name.endswith("/"):
+            for info in archive.infolist():
+                if info.is_dir():
                     continue
-                lower_name = name.lower()
+                lower_name = info.filename.lower()
                 if not (lower_name.endswith(".md") or lower_name.endswith(".mdx")):
                     continue
-                content = archive.read(name).decode("utf-8", errors="replace")
-                docs.append(
-                    {
-                        "filename": strip_first_path_component(name),
-                        "content": content,
-                    }
-                )
+                content = archive.read(info).decode("utf-8", errors="replace")
+                yield {
+                    "filename": strip_first_path_component(info.filename),
+                    "content": content,
+                }
     except zipfile.BadZipFile:
         print(f"Skipping non-zip file: {zip_path.name}")
-    return docs
+
+
+def iter_documents(workdir: Path) -> Iterator[dict[str, str]]:
+    for zip_path in sorted(workdir.glob("*.zip")):
+        yield from iter_markdown_from_zip(zip_path)
 
 
 def load_documents(workdir: Path) -> list[dict[str, str]]:
-    zip_files = sorted(workdir.glob("*.zip"))
-    docs: list[dict[str, str]] = []
-    for zip_path in zip_files:
-        docs.extend(iter_markdown_from_zip(zip_path))
-    return docs
+    return list(iter_documents(workdir))
+
+
+def slugify(heading: str) -> str:
+    """GitHub-style anchor for a heading."""
+    slug = re.sub(r"[^\w\- ]", "", heading.strip().lower())
+    return slug.replace(" ", "-")
+
+
+def split_sections(content: str) -> list[tuple[str, str]]:
+    """Split markdown at headings (ignoring ``#`` lines in code blocks) into ``(heading, text)``."""
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    in_code = False
+    for line in content.splitlines(keepends=True):
+        if FENCE.match(line):
+            in_code = not in_code
+        match = None if in_code else HEADING.match(line)
+        if match:
+            sections.append((match.group(2), [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(heading, "".join(lines)) for heading, lines in sections if "".join(lines).strip()]
+
+
+def token_windows(text: str, max_tokens: int, overlap: int) -> list[str]:
+    """Cut ``text`` into spans of at most ``max_tokens`` tokens, keeping its original formatting."""
+    spans = [match.span() for match in TOKEN.finditer(text)]
+    if len(spans) <= max_tokens:
+        return [text.strip()]
+    step = max(max_tokens - overlap, 1)
+    windows = []
+    for start in range(0, len(spans), step):
+        stop = min(start + max_tokens, len(spans))
+        windows.append(text[spans[start][0] : spans[stop - 1][1]])
+        if stop == len(spans):
+            break
+    return windows
+
+
+def chunk_document(
+    doc: dict[str, str],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS,
+) -> list[dict[str, str]]:
+    """Split one markdown document into passages with their section and anchor."""
+    chunks: list[dict[str, str]] = []
+    seen: dict[str, int] = {}
+    for heading, text in split_sections(doc["content"]):
+        anchor = slugify(heading) if heading else ""
+        if anchor:
+            count = seen.get(anchor, 0)
+            seen[anchor] = count + 1
+            if count:
+                anchor = f"{anchor}-{count}"
+        for window in token_windows(text, max_tokens, overlap):
+            chunks.append({"filename": doc["filename"], "section": heading, "anchor": anchor, "content": window})
+    return chunks
+
+
+def iter_chunks(docs: Iterable[dict[str, str]]) -> Iterator[dict[str, str]]:
+    for doc in docs:
+        yield from chunk_document(doc)
+
+
+def chunk_documents(docs: Iterable[dict[str, str]]) -> list[dict[str, str]]:
+    return list(iter_chunks(docs))
+
+
+def index_archive(zip_path: Path, backend: str = "minsearch") -> SearchBackend:
+    """Index an archive's passages, streaming files through the chunker.
+
+    Only the passages are kept (the index needs them to return results); each
+    file's full text is dropped as soon as it has been chunked.
+    """
+    return backend_class(backend)().fit(list(iter_chunks(iter_markdown_from_zip(zip_path))))
 
 
 def build_index(docs: list[dict[str, str]]) -> Index:
-    index = Index(text_fields=["content", "filename"], keyword_fields=[])
+    index = Index(text_fields=list(TEXT_FIELDS), keyword_fields=[])
     index.fit(docs)
     return index
 
 
+class SearchBackend(Protocol):
+    """A search engine over passages: fitted once, then asked to score queries.
+
+    ``score`` returns one relevance per passage (0 for no match), with each
+    field's contribution multiplied by its entry in ``boosts`` (default 1).
+    """
+
+    name: ClassVar[str]
+    docs: list[dict[str, str]]
+
+    def fit(self, docs: list[dict[str, str]]) -> SearchBackend: ...
+
+    def score(self, query: str, boosts: Mapping[str, float] | None = None) -> np.ndarray: ...
+
+
+class MinsearchBackend:
+    """minsearch's TF-IDF index, scored the way ``Index.search`` ranks."""
+
+    name = "minsearch"
+
+    def __init__(self) -> None:
+        self.index = Index(text_fields=list(TEXT_FIELDS), keyword_fields=[])
+
+    @property
+    def docs(self) -> list[dict[str, str]]:
+        return self.index.docs
+
+    def fit(self, docs: list[dict[str, str]]) -> MinsearchBackend:
+        self.index.fit(docs)
+        return self
+
+    def score(self, query: str, boosts: Mapping[str, float] | None = None) -> np.ndarray:
+        """TF-IDF rows are already L2-normalized, so the cosine similarity
+        ``Index.search`` computes is a sparse dot product; this skips
+        re-normalizing the whole document matrix on every query.
+        """
+        boosts = boosts or {}
+        scores = np.zeros(len(self.docs))
+        if not self.docs:
+            return scores
+        for field in self.index.text_fields:
+            query_vector = self.index.vectorizers[field].transform([query])
+            similarity = (self.index.text_matrices[field] @ query_vector.T).toarray().ravel()
+            scores += boosts.get(field, 1.0) * similarity
+        return scores
+
+
+class BM25Backend:
+    """Okapi BM25 over one sparse matrix with a column per (field, term).
+
+    Each entry holds the term's full BM25 weight in that passage field
+    (idf times the saturated, length-normalized term frequency), computed once
+    by ``fit``. Scoring a query is then one column slice of the CSC matrix and
+    one sparse-dense product, with the field boosts folded into the query vector.
+    """
+
+    name = "bm25"
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B) -> None:
+        self.k1 = k1
+        self.b = b
+        self.docs: list[dict[str, str]] = []
+        # Column of each term, per field.
+        self.columns: dict[str, dict[str, int]] = {}
+        self.matrix = sparse.csc_matrix((0, 0))
+
+    def fit(self, docs: list[dict[str, str]]) -> BM25Backend:
+        self.docs = docs
+        blocks = []
+        offset = 0
+        for field in TEXT_FIELDS:
+            block, vocabulary = self._field_weights(field)
+            self.columns[field] = {term: offset + column for term, column in vocabulary.items()}
+            offset += len(vocabulary)
+            blocks.append(block)
+        self.matrix = sparse.hstack(blocks, format="csc")
+        return self
+
+    def _field_weights(self, field: str) -> tuple[sparse.csr_matrix, dict[str, int]]:
+        vocabulary: defaultdict[str, int] = defaultdict()
+        vocabulary.default_factory = vocabulary.__len__
+        terms: list[int] = []
+        indptr = [0]
+        for doc in self.docs:
+            terms.extend(vocabulary[term] for term in TERM.findall((doc.get(field) or "").lower()))
+            indptr.append(len(terms))
+        shape = (len(self.docs), len(vocabulary))
+        counts = sparse.csr_matrix((np.ones(len(terms)), terms, indptr), shape=shape)
+        counts.sum_duplicates()
+
+        lengths = np.diff(indptr)
+        average = lengths.mean() if lengths.sum() else 1.0
+        frequency = np.bincount(counts.indices, minlength=shape[1])
+        idf = np.log1p((shape[0] - frequency + 0.5) / (frequency + 0.5))
+        rows = np.repeat(np.arange(shape[0]), np.diff(counts.indptr))
+        saturation = self.k1 * (1 - self.b + self.b * lengths[rows] / average)
+        counts.data = idf[counts.indices] * counts.data * (self.k1 + 1) / (counts.data + saturation)
+        return counts, dict(vocabulary)
+
+    def score(self, query: str, boosts: Mapping[str, float] | None = None) -> np.ndarray:
+        boosts = boosts or {}
+        terms = Counter(TERM.findall(query.lower()))
+        columns: list[int] = []
+        weights: list[float] = []
+        for field, vocabulary in self.columns.items():
+            boost = boosts.get(field, 1.0)
+            for term, count in terms.items():
+                column = vocabulary.get(term)
+                if column is not None:
+                    columns.append(column)
+                    weights.append(boost * count)
+        if not columns:
+            return np.zeros(len(self.docs))
+        return self.matrix[:, columns] @ np.array(weights)
+
+
+BACKENDS: dict[str, type[SearchBackend]] = {backend.name: backend for backend in (MinsearchBackend, BM25Backend)}
+
+
+def backend_class(name: str) -> type[SearchBackend]:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown search backend {name!r}; expected one of {', '.join(BACKENDS)}") from None
+
+
+def parse_boosts(text: str) -> dict[str, float]:
+    """Parse field boosts written as ``filename=2,section=1.5``."""
+    boosts: dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        field, separator, value = item.partition("=")
+        field = field.strip()
+        if not separator or field not in TEXT_FIELDS:
+            raise ValueError(f"Invalid field boost {item!r}; expected <field>=<number> with a field in {', '.join(TEXT_FIELDS)}")
+        boosts[field] = float(value)
+    return boosts
+
+
 def search(index: Index, query: str, limit: int = 5) -> list[dict[str, str]]:
     return index.search(query, num_results=limit)
 
 
+@dataclass(frozen=True)
+class ArchiveStamp:
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+@dataclass
+class ArchiveIndex:
+    zip_path: Path
+    stamp: ArchiveStamp
+    index: SearchBackend
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        while chunk := file.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_path_for(zip_path: Path) -> Path:
+    return zip_path.with_name(zip_path.name + INDEX_SUFFIX)
+
+
+def read_saved_index(zip_path: Path, backend: str = "minsearch") -> ArchiveIndex | None:
+    try:
+        with index_path_for(zip_path).open("rb") as file:
+            saved = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as exc:
+        print(f"Ignoring unreadable index for {zip_path.name}: {exc}")
+        return None
+    if not isinstance(saved, dict) or saved.get("format") != INDEX_FORMAT or saved.get("backend") != backend:
+        return None
+    return ArchiveIndex(zip_path, saved["stamp"], saved["index"])
+
+
+def save_index(archive: ArchiveIndex) -> None:
+    path = index_path_for(archive.zip_path)
+    partial = path.with_name(path.name + ".tmp")
+    with partial.open("wb") as file:
+        pickle.dump(
+            {"format": INDEX_FORMAT, "backend": archive.index.name, "stamp": archive.stamp, "index": archive.index},
+            file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(partial, path)
+
+
+def is_current(archive: ArchiveIndex | None, stat: os.stat_result) -> bool:
+    return archive is not None and (archive.stamp.size, archive.stamp.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+
+def timed_load_archive_index(zip_path: Path, backend: str = "minsearch") -> tuple[ArchiveIndex, str, float]:
+    started = time.perf_counter()
+    archive, origin = load_archive_index(zip_path, backend=backend)
+    return archive, origin, time.perf_counter() - started
+
+
+def prepare_saved_index(zip_path: Path, backend: str = "minsearch") -> tuple[str, float]:
+    """Make sure the archive's saved index is current; runs in a worker process.
+
+    Only the outcome goes back to the caller, which then reads the saved
+    index itself rather than receiving a second pickled copy through the pipe.
+    """
+    _, origin, seconds = timed_load_archive_index(zip_path, backend)
+    return origin, seconds
+
+
+def load_archive_index(
+    zip_path: Path,
+    current: ArchiveIndex | None = None,
+    backend: str = "minsearch",
+) -> tuple[ArchiveIndex, str]:
+    """Return the index of one archive, building and saving it only if the archive changed.
+
+    ``current`` (an index already in memory) or the saved index is reused when
+    the archive's size and mtime are unchanged. If they changed, the content
+    hash decides, so a touched but identical archive is not re-indexed.
+    A saved index of another backend is replaced. Also returns where the
+    index came from: ``memory``, ``disk`` or ``built``.
+    """
+    stat = zip_path.stat()
+    if is_current(current, stat):
+        return current, "memory"
+    known = read_saved_index(zip_path, backend) or current
+    if is_current(known, stat):
+        return known, "disk"
+    sha256 = file_sha256(zip_path)
+    stamp = ArchiveStamp(stat.st_size, stat.st_mtime_ns, sha256)
+    if known and known.stamp.sha256 == sha256:
+        archive, origin = ArchiveIndex(zip_path, stamp, known.index), "disk"
+    else:
+        archive, origin = ArchiveIndex(zip_path, stamp, index_archive(zip_path, backend)), "built"
+    save_index(archive)
+    return archive, origin
+
+
+def top_k(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Positions of the ``limit`` best positive scores, best first.
+
+    ``argpartition`` selects them in linear time; only those are sorted.
+    """
+    hits = np.flatnonzero(scores > 0)
+    if limit <= 0:
+        return hits[:0]
+    if len(hits) > limit:
+        hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+    return hits[np.argsort(-scores[hits])]
+
+
+def search_archives(
+    archives: Iterable[ArchiveIndex],
+    query: str,
+    limit: int = 5,
+    boosts: Mapping[str, float] | None = None,
+) -> list[dict[str, str]]:
+    """Search several archive indexes and merge their best matches by score."""
+    matches: list[tuple[float, dict[str, str]]] = []
+    for archive in archives:
+        scores = archive.index.score(query, boosts)
+        matches.extend((float(scores[i]), archive.index.docs[i]) for i in top_k(scores, limit))
+    matches.sort(key=lambda match: -match[0])
+    return [doc for _, doc in matches[:limit]]
+
+
+class IndexRegistry:
+    """The archive indexes of one directory, shared by every search in the process.
+
+    ``archives()`` rescans the directory at most every ``rescan_interval``
+    seconds; only archives that are new or changed since the last scan are
+    loaded or re-indexed, and removed ones are dropped. When several need
+    work, they are handled in parallel by up to ``workers`` processes. A lock
+    makes concurrent callers wait for one build instead of each doing their own.
+    Every archive is indexed with the search backend named by ``backend``.
+    """
+
+    def __init__(
+        self,
+        workdir: Path,
+        rescan_interval: float = 1.0,
+        workers: int | None = None,
+        backend: str = "minsearch",
+    ) -> None:
+        backend_class(backend)  # fail on an unknown name now rather than on the first search
+        self.workdir = workdir
+        self.backend = backend
+        self.rescan_interval = rescan_interval
+        self.workers = workers or os.cpu_count() or 1
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.last_build_seconds = 0.0
+        self._archives: dict[Path, ArchiveIndex] = {}
+        self._scanned_at: float | None = None
+        self._lock = threading.Lock()
+
+    def archives(self) -> list[ArchiveIndex]:
+        with self._lock:
+            now = time.monotonic()
+            if self._scanned_at is None or now - self._scanned_at >= self.rescan_interval:
+                self._rescan()
+                self._scanned_at = now
+            else:
+                self.hits += len(self._archives)
+            return list(self._archives.values())
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "archives": len(self._archives),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "builds": self.builds,
+            "buildSeconds": round(self.build_seconds, 3),
+            "lastBuildSeconds": round(self.last_build_seconds, 3),
+        }
+
+    def _rescan(self) -> None:
+        archives: dict[Path, ArchiveIndex] = {}
+        stale: list[Path] = []
+        for zip_path in sorted(self.workdir.glob("*.zip")):
+            current = self._archives.get(zip_path)
+            if is_current(current, zip_path.stat()):
+                archives[zip_path] = current
+                self.hits += 1
+            else:
+                stale.append(zip_path)
+        if len(stale) > 1 and self.workers > 1:
+            # Workers only need this module; spawn avoids forking the server's threads.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(stale)), mp_context=context) as pool:
+                outcomes = list(pool.map(prepare_saved_index, stale, itertools.repeat(self.backend)))
+            loaded = [
+                (read_saved_index(zip_path, self.backend), origin, seconds)
+                for zip_path, (origin, seconds) in zip(stale, outcomes)
+            ]
+        else:
+            loaded = [timed_load_archive_index(zip_path, self.backend) for zip_path in stale]
+        for zip_path, (archive, origin, seconds) in zip(stale, loaded):
+            archives[zip_path] = archive
+            self.misses += 1
+            if origin == "built":
+                self.builds += 1
+                self.last_build_seconds = seconds
+                self.build_seconds += seconds
+        self._archives = archives
+
+
 def main() -> None:
     zip_path = Path.cwd() / FASTMCP_ZIP_NAME
     download_fastmcp_zip(zip_path)
@@ -0,0 +1,140 @@
+"""Compare the sync (threadpool) and async database paths on the same queries.
+
+Seeds a temporary SQLite database, then runs ``--requests`` leaderboard page
+queries and session lookups with ``--concurrency`` in flight, once through
+``SessionLocal`` on FastAPI's threadpool (how handlers used to run) and once
+through ``AsyncSessionLocal``.
+
+    uv run python benchmarks/db_paths.py --rows 100000 --concurrency 64
+
+Pass ``--database-url`` to run against Postgres instead.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    return parser.parse_args()
+
+
+def seed(main, rows: int) -> str:
+    main.Base.metadata.create_all(bind=main.engine)
+    with main.SessionLocal() as db:
+        main.seed_database(db)
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        db.execute(
+            main.insert(main.LeaderboardEntryModel),
+            [
+                {
+                    "id": f"bench-{i}",
+                    "username": f"player{i % 1000}",
+                    "score": (i * 7919) % 10_000,
+                    "mode": "walls" if i % 2 else "pass-through",
+                    "played_at": start + timedelta(seconds=i),
+                }
+                for i in range(rows)
+            ],
+        )
+        token = "bench-session"
+        now = datetime.now(timezone.utc)
+        db.merge(
+            main.SessionModel(
+                token=token,
+                email="player1@test.com",
+                user_id="1",
+                created_at=now,
+                expires_at=now + timedelta(seconds=main.SESSION_TTL),
+            )
+        )
+        db.commit()
+    return token
+
+
+def sync_request(main, token: str, mode) -> None:
+    with main.SessionLocal() as db:
+        rows = db.execute(
+            main.select(*main.LEADERBOARD_COLUMNS)
+            .where(main.LeaderboardEntryModel.mode == mode.value)
+            .order_by(
+                main.LeaderboardEntryModel.score.desc(),
+                main.LeaderboardEntryModel.played_at,
+                main.LeaderboardEntryModel.id,
+            )
+            .limit(50)
+        ).all()
+        [main.leaderboard_row(*row) for row in rows]
+        db.execute(
+            main.select(main.UserModel)
+            .join(main.SessionModel, main.SessionModel.user_id == main.UserModel.id)
+            .where(main.SessionModel.token == token)
+        ).scalars().first()
+
+
+async def async_request(main, token: str, mode) -> None:
+    async with main.AsyncSessionLocal() as db:
+        entries = await main.query_leaderboard_page(db, mode, None, 50)
+        assert entries
+    await main.load_session_user(token)
+
+
+async def run(label: str, make_call, total: int, concurrency: int) -> dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await make_call(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>6}: {total} requests in {elapsed:.2f}s -> {total / elapsed:,.0f} req/s")
+    return {"seconds": elapsed, "rps": total / elapsed}
+
+
+async def main_async(args: argparse.Namespace, main) -> None:
+    from fastapi.concurrency import run_in_threadpool
+
+    token = seed(main, args.rows)
+    modes = list(main.GameMode)
+
+    await run(
+        "sync",
+        lambda i: run_in_threadpool(sync_request, main, token, modes[i % 2]),
+        args.requests,
+        args.concurrency,
+    )
+    await run(
+        "async",
+        lambda i: async_request(main, token, modes[i % 2]),
+        args.requests,
+        args.concurrency,
+    )
+    await main.async_engine.dispose()
+
+
+def cli() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        import main
+
+        asyncio.run(main_async(args, main))
+
+
+if __name__ == "__main__":
+    cli()
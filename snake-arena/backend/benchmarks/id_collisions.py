@@ -0,0 +1,96 @@
+"""Insert scores from several processes at once and count id collisions.
+
+Each worker process imports the app against one shared temporary SQLite
+database, leases a worker id the way the server does on startup, then writes
+``--rows`` score submissions through ``write_score_batch`` in batches of
+``--batch-size``. Every id is generated in the same few milliseconds by
+several processes, which is where timestamp ids used to collide.
+
+    uv run python benchmarks/id_collisions.py --workers 4 --rows 20000
+
+Pass ``--timestamp-ids`` to generate ids the old way for comparison.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=20_000, help="rows per worker")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--timestamp-ids", action="store_true")
+    return parser.parse_args()
+
+
+async def insert_rows(args: argparse.Namespace, start) -> tuple[int, int, int]:
+    import main
+
+    worker_id = await main.claim_worker_id()
+    main.id_generator.worker_id = worker_id
+    start.wait()
+    errors = 0
+    for offset in range(0, args.rows, args.batch_size):
+        batch = []
+        for i in range(offset, min(offset + args.batch_size, args.rows)):
+            now = datetime.now(timezone.utc)
+            entry_id = str(int(now.timestamp() * 1000)) if args.timestamp_ids else main.id_generator.next_id()
+            batch.append(main.ScoreSubmission(entry_id, "1", "SnakeMaster", i, "walls", now))
+        errors += sum(error is not None for error in await main.write_score_batch(batch))
+    await main.release_worker_lease()
+    await main.async_engine.dispose()
+    return worker_id, args.rows - errors, errors
+
+
+def worker(args: argparse.Namespace, start, results) -> None:
+    results.put(asyncio.run(insert_rows(args, start)))
+
+
+def cli() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        import main
+
+        main.Base.metadata.create_all(bind=main.engine)
+        with main.SessionLocal() as db:
+            main.seed_database(db)
+            seeded = db.query(main.LeaderboardEntryModel).count()
+
+        context = multiprocessing.get_context("spawn")
+        start = context.Event()
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(args, start, results)) for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        time.sleep(2)  # let every worker import the app and lease its id
+        started = time.perf_counter()
+        start.set()
+        outcomes = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - started
+        for process in processes:
+            process.join()
+
+        with main.SessionLocal() as db:
+            total = db.query(main.LeaderboardEntryModel).count() - seeded
+        inserted = sum(rows for _, rows, _ in outcomes)
+        errors = sum(failed for _, _, failed in outcomes)
+        print(f"worker ids: {sorted(worker_id for worker_id, _, _ in outcomes)}")
+        print(f"inserted {inserted:,} rows in {elapsed:.2f}s -> {inserted / elapsed:,.0f} inserts/s")
+        print(f"rejected (duplicate ids): {errors:,}")
+        print(f"rows stored: {total:,} of {args.workers * args.rows:,} submitted")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,95 @@
+"""Measure how fast recorded games are re-simulated for verification.
+
+Records ``--games`` games of up to ``--ticks`` ticks with random turns, encodes
+them as replays, then verifies them with ``verify_replays`` in this process
+and in a pool of ``--workers`` processes, split the way the server splits a
+batch.
+
+    uv run python benchmarks/replay_verify.py --games 2000 --ticks 2000 --workers 4
+
+``x real time`` compares the throughput with games played at ``--tick-rate``
+ticks per second.
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from replays import encode, verify_replays  # noqa: E402
+from snake_engine import DIRECTIONS, NO_TURN, GameBatch  # noqa: E402
+
+MODES = ("walls", "pass-through")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=2_000)
+    parser.add_argument("--ticks", type=int, default=2_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--turn-probability", type=float, default=0.1)
+    parser.add_argument("--tick-rate", type=float, default=10.0)
+    return parser.parse_args()
+
+
+def record(args: argparse.Namespace) -> list[tuple[str, bytes]]:
+    """Play random games in one batch and encode each as a replay."""
+    rng = np.random.default_rng(1)
+    batch = GameBatch(capacity=args.games)
+    modes = [MODES[i % 2] for i in range(args.games)]
+    slots = batch.add_many(modes, range(args.games))
+    turns: list[list[tuple[int, str]]] = [[] for _ in range(args.games)]
+    last_change = np.zeros(args.games, dtype=np.int64)
+    ticks = np.zeros(args.games, dtype=np.int64)
+    for tick in range(1, args.ticks + 1):
+        codes = np.where(
+            rng.random(batch.capacity) < args.turn_probability,
+            rng.integers(0, len(DIRECTIONS), batch.capacity),
+            NO_TURN,
+        ).astype(np.int8)
+        codes[~batch.alive] = NO_TURN
+        for slot in np.flatnonzero(codes != NO_TURN):
+            turns[slot].append((tick - int(last_change[slot]), DIRECTIONS[codes[slot]]))
+            last_change[slot] = tick
+        ticks[batch.alive] = tick
+        batch.tick(codes)
+        if not batch.alive.any():
+            break
+    return [(modes[slot], encode(int(slot), int(ticks[slot]), turns[slot])) for slot in slots]
+
+
+def report(label: str, ticks: int, elapsed: float, args: argparse.Namespace) -> None:
+    rate = ticks / elapsed
+    print(f"{label:>12}: {rate:,.0f} ticks/s ({elapsed:.2f}s, {rate / args.tick_rate:,.0f}x real time)")
+
+
+def cli() -> None:
+    args = parse_args()
+    games = record(args)
+    size = sum(len(data) for _, data in games)
+    print(f"{len(games):,} replays, {size / len(games):.0f} bytes each on average")
+
+    started = time.perf_counter()
+    results, _ = verify_replays(games)
+    ticks = sum(result.ticks for result in results)
+    assert all(result.complete for result in results)
+    report("1 process", ticks, time.perf_counter() - started, args)
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        list(pool.map(verify_replays, [games[:1]] * args.workers))  # start the workers
+        started = time.perf_counter()
+        shares = [games[i :: args.workers] for i in range(args.workers)]
+        list(pool.map(verify_replays, shares))
+        report(f"{args.workers} processes", ticks, time.perf_counter() - started, args)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,97 @@
+"""Per-row cost of serializing a leaderboard page, before and after the fast path.
+
+``before`` is what ``/leaderboard`` used to do: load ORM objects, convert each
+to a ``LeaderboardEntry`` model, then let FastAPI validate the result against
+``response_model`` and encode it with ``JSONResponse``. ``after`` builds the
+JSON dicts from selected column tuples and encodes them with ``ORJSONResponse``.
+Both time only the work done after the rows are fetched.
+
+    uv run python benchmarks/serialization.py --rows 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    return parser.parse_args()
+
+
+async def measure(render, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await render()
+    return time.perf_counter() - started
+
+
+def report(label: str, seconds: float, pages: int, rows: int) -> float:
+    per_row = seconds / (pages * rows) * 1e6
+    print(f"{label:>6}: {seconds / pages * 1000:8.3f} ms per {rows}-row page, {per_row:6.2f} us per row")
+    return per_row
+
+
+def cli() -> None:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        import main
+        from fastapi.responses import JSONResponse, ORJSONResponse
+        from fastapi.routing import serialize_response
+
+        route = next(route for route in main.api_app.routes if getattr(route, "path", None) == "/leaderboard")
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        entries = [
+            main.LeaderboardEntryModel(
+                id=f"bench-{i}",
+                username=f"player{i}",
+                score=10_000 - i,
+                mode="walls",
+                played_at=start + timedelta(seconds=i),
+            )
+            for i in range(args.rows)
+        ]
+        rows = [(entry.id, entry.username, entry.score, entry.mode, entry.played_at) for entry in entries]
+
+        async def before() -> bytes:
+            data = [
+                main.LeaderboardEntry(
+                    id=entry.id,
+                    username=entry.username,
+                    score=entry.score,
+                    mode=main.GameMode(entry.mode),
+                    played_at=main.normalize_datetime(entry.played_at).isoformat().replace("+00:00", "Z"),
+                )
+                for entry in entries
+            ]
+            content = main.ApiResponseLeaderboardList(success=True, data=data, next_cursor=None)
+            serialized = await serialize_response(field=route.response_field, response_content=content)
+            return JSONResponse(serialized).body
+
+        async def after() -> bytes:
+            data = [main.leaderboard_row(*row) for row in rows]
+            return ORJSONResponse({"success": True, "data": data, "nextCursor": None, "error": None}).body
+
+        async def run() -> None:
+            assert json.loads(await before()) == json.loads(await after())
+            old = report("before", await measure(before, args.repeat), args.repeat, args.rows)
+            new = report("after", await measure(after, args.repeat), args.repeat, args.rows)
+            print(f"speedup: {old / new:.1f}x")
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,93 @@
+"""Simulate many snake games at once and report throughput per core.
+
+Runs ``--games`` concurrent games for ``--ticks`` ticks with random turns,
+restarting games as they die, once with ``GameBatch`` (one NumPy step per
+tick for all games) and once with a ``LiveGame`` per game (one Python step
+per game per tick). Both run in this single process, so the numbers are per
+core.
+
+    uv run python benchmarks/simulation.py --games 10000 --ticks 200
+
+``games at N Hz`` is how many games one core could keep running in real time
+at ``--tick-rate`` ticks per second.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from live_games import LiveGame  # noqa: E402
+from snake_engine import DIRECTIONS, NO_TURN, GameBatch  # noqa: E402
+
+MODES = ("walls", "pass-through")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--turn-probability", type=float, default=0.2)
+    parser.add_argument("--tick-rate", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def run_batch(args: argparse.Namespace) -> tuple[float, int]:
+    rng = np.random.default_rng(args.seed)
+    batch = GameBatch(capacity=args.games)
+    batch.add_many([MODES[i % 2] for i in range(args.games)], range(args.games))
+    restarted = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        turns = np.where(
+            rng.random(batch.capacity) < args.turn_probability,
+            rng.integers(0, len(DIRECTIONS), batch.capacity),
+            NO_TURN,
+        ).astype(np.int8)
+        ended = batch.tick(turns)
+        batch.remove(ended)
+        batch.add_many([MODES[slot % 2] for slot in ended], range(args.games + restarted, args.games + restarted + len(ended)))
+        restarted += len(ended)
+    return time.perf_counter() - started, restarted
+
+
+def run_objects(args: argparse.Namespace) -> tuple[float, int]:
+    rng = random.Random(args.seed)
+    games = [LiveGame(str(i), "bench", MODES[i % 2], "", rng) for i in range(args.games)]
+    restarted = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        for i, game in enumerate(games):
+            if rng.random() < args.turn_probability:
+                game.turn(rng.choice(DIRECTIONS))
+            game.tick()
+            if not game.is_playing:
+                games[i] = LiveGame(str(i), "bench", MODES[i % 2], "", rng)
+                restarted += 1
+    return time.perf_counter() - started, restarted
+
+
+def report(label: str, args: argparse.Namespace, elapsed: float, restarted: int) -> None:
+    game_ticks = args.games * args.ticks / elapsed
+    print(
+        f"{label:>8}: {game_ticks:,.0f} game-ticks/s per core, "
+        f"{game_ticks / args.tick_rate:,.0f} games at {args.tick_rate:g} Hz "
+        f"({elapsed:.2f}s, {restarted:,} games ended)"
+    )
+
+
+def cli() -> None:
+    args = parse_args()
+    report("batch", args, *run_batch(args))
+    report("objects", args, *run_objects(args))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,99 @@
+"""Maintenance commands for the Snake Arena database.
+
+    uv run python cli.py backfill-user-stats --chunk-size 5000
+    uv run python cli.py export-scores --format ndjson --output scores.ndjson
+    uv run python cli.py import-scores --format csv scores.csv
+
+Commands use ``DATABASE_URL`` like the server does.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import AsyncIterator, TextIO
+
+import main
+from score_transfer import FORMATS, read_records
+
+
+def backfill_user_stats(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    with main.engine.begin() as connection:
+        main.migrate_schema(connection)
+    with main.SessionLocal() as db:
+        written = main.backfill_user_stats(db, chunk_size=args.chunk_size)
+    print(f"wrote {written} user_stats rows in {time.perf_counter() - started:.1f}s")
+
+
+async def write_export(fmt: str, chunk_size: int, output: TextIO) -> None:
+    async for text in main.export_scores(fmt, chunk_size):
+        output.write(text)
+    await main.async_engine.dispose()
+
+
+def export_scores(args: argparse.Namespace) -> None:
+    if args.output == "-":
+        asyncio.run(write_export(args.format, args.chunk_size, sys.stdout))
+        return
+    with open(args.output, "w", encoding="utf-8", newline="") as output:
+        asyncio.run(write_export(args.format, args.chunk_size, output))
+
+
+async def iter_file_lines(source: TextIO) -> AsyncIterator[str]:
+    for line in source:
+        yield line.rstrip("\r\n")
+
+
+async def read_import(fmt: str, chunk_size: int, source: TextIO) -> int:
+    async with main.async_engine.begin() as connection:
+        await connection.run_sync(main.migrate_schema)
+    records = read_records(iter_file_lines(source), fmt, {mode.value for mode in main.GameMode})
+    # Servers in other processes only see leaderboard versions kept in the database.
+    backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+    try:
+        return await main.import_scores(records, chunk_size, backend)
+    finally:
+        await main.async_engine.dispose()
+
+
+def import_scores(args: argparse.Namespace) -> None:
+    started = time.perf_counter()
+    if args.input == "-":
+        rows = asyncio.run(read_import(args.format, args.chunk_size, sys.stdin))
+    else:
+        with open(args.input, encoding="utf-8", newline="") as source:
+            rows = asyncio.run(read_import(args.format, args.chunk_size, source))
+    print(f"imported {rows} rows in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-user-stats", help="rebuild user_stats from leaderboard history")
+    backfill.add_argument("--chunk-size", type=int, default=1000)
+    backfill.set_defaults(handler=backfill_user_stats)
+
+    export = commands.add_parser("export-scores", help="stream leaderboard_entries out as NDJSON or CSV")
+    export.add_argument("--format", choices=FORMATS, default="ndjson")
+    export.add_argument("--output", default="-", help="file to write, or - for stdout")
+    export.add_argument("--chunk-size", type=int, default=main.SCORE_TRANSFER_CHUNK_SIZE)
+    export.set_defaults(handler=export_scores)
+
+    load = commands.add_parser("import-scores", help="load leaderboard_entries from NDJSON or CSV")
+    load.add_argument("input", help="file to read, or - for stdin")
+    load.add_argument("--format", choices=FORMATS, default="ndjson")
+    load.add_argument("--chunk-size", type=int, default=main.SCORE_TRANSFER_CHUNK_SIZE)
+    load.set_defaults(handler=import_scores)
+    return parser
+
+
+def run() -> None:
+    args = build_parser().parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    run()
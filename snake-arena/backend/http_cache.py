@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts: object) -> str:
+    """Strong validator for a response fully determined by ``parts``."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``.
+
+    If-None-Match uses weak comparison, so a ``W/`` prefix on the client's
+    copy is ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cache_control(max_age: int) -> str:
+    # With no max-age, caches may still store the response but must revalidate it.
+    return f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+
+def not_modified(etag: str, max_age: int) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control(max_age)})
+
+
+def set_cache_headers(response: Response, etag: str, max_age: int) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(max_age)
+    return response
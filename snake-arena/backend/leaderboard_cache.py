@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import heapq
+import secrets
+import threading
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from sortedcontainers import SortedKeyList
+
+from ids import current_millis
+from ranking import ScoreRankIndex
+
+# Entries are ordered by score (highest first), then by who got there first,
+# then by id so that every key is unique and usable as a pagination cursor.
+LeaderboardKey = tuple[int, datetime, str]
+
+
+def leaderboard_key(score: int, played_at: datetime, entry_id: str) -> LeaderboardKey:
+    return (-score, played_at, entry_id)
+
+
+class InvalidationBackend:
+    """Shared per-mode version counters used to detect writes from other processes.
+
+    ``epoch`` names the lifetime of the counters: two equal versions only
+    describe the same data if they come from the same epoch. The generation
+    only moves on ``reset``, for writes that readers cannot pick up
+    incrementally (such as bulk imports with arbitrary ids).
+    """
+
+    epoch = "0"
+
+    async def version(self, mode: str) -> int:
+        raise NotImplementedError
+
+    async def generation(self, mode: str) -> int:
+        raise NotImplementedError
+
+    async def bump(self, mode: str) -> int:
+        raise NotImplementedError
+
+    async def reset(self, mode: str) -> int:
+        """Bump the version and the generation, so readers reload ``mode`` in full."""
+        raise NotImplementedError
+
+
+class LocalInvalidationBackend(InvalidationBackend):
+    """Single-process stand-in: every write goes through this process."""
+
+    def __init__(self) -> None:
+        # Counters restart with the process, so each process gets its own epoch.
+        self.epoch = secrets.token_hex(8)
+        self._versions: dict[str, int] = {}
+        self._generations: dict[str, int] = {}
+
+    async def version(self, mode: str) -> int:
+        return self._versions.get(mode, 0)
+
+    async def generation(self, mode: str) -> int:
+        return self._generations.get(mode, 0)
+
+    async def bump(self, mode: str) -> int:
+        self._versions[mode] = self._versions.get(mode, 0) + 1
+        return self._versions[mode]
+
+    async def reset(self, mode: str) -> int:
+        self._generations[mode] = self._generations.get(mode, 0) + 1
+        return await self.bump(mode)
+
+
+class RankedLeaderboard:
+    """Sorted (key, entry) pairs for one game mode, plus a rank index by player.
+
+    Entries are the API's JSON dicts, so pages can be returned without conversion.
+    Pairs are kept in a ``SortedKeyList`` (compared by key only), so inserts
+    and cursor lookups are O(log n).
+    """
+
+    def __init__(self) -> None:
+        self._rows: SortedKeyList = SortedKeyList(key=itemgetter(0))
+        self.ranks = ScoreRankIndex()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: LeaderboardKey) -> bool:
+        position = self._rows.bisect_key_left(key)
+        return position < len(self._rows) and self._rows[position][0] == key
+
+    def load(self, rows: Iterable[tuple[LeaderboardKey, Any]]) -> None:
+        self._rows = SortedKeyList(rows, key=itemgetter(0))
+        self.ranks = ScoreRankIndex()
+        for _, entry in self._rows:
+            self.ranks.add(entry["username"], entry["score"])
+
+    def insert(self, key: LeaderboardKey, entry: Any) -> None:
+        self._rows.add((key, entry))
+        self.ranks.add(entry["username"], entry["score"])
+
+    def iter_after(self, after: Optional[LeaderboardKey]) -> Iterator[tuple[LeaderboardKey, Any]]:
+        if after is None:
+            return iter(self._rows)
+        return self._rows.irange_key(min_key=after, inclusive=(False, True))
+
+
+class LeaderboardCache:
+    """Process-local ranked leaderboards, one per game mode.
+
+    Each board carries the backend version it reflects. A board whose version
+    lags behind the backend has missed a write (from another worker, or a
+    concurrent one in this process) and must catch up before it is read: with
+    the entries created since it was last in sync (``synced_at``, unix
+    milliseconds), or in full if it was never loaded or the backend's
+    generation moved.
+    """
+
+    def __init__(
+        self,
+        modes: Iterable[str],
+        backend: InvalidationBackend,
+        clock: Callable[[], int] = current_millis,
+    ) -> None:
+        self.backend = backend
+        self._clock = clock
+        self._boards = {mode: RankedLeaderboard() for mode in modes}
+        self._versions: dict[str, Optional[int]] = {mode: None for mode in self._boards}
+        self._generations: dict[str, Optional[int]] = {mode: None for mode in self._boards}
+        self._synced_at: dict[str, Optional[int]] = {mode: None for mode in self._boards}
+        self._lock = threading.Lock()
+
+    @property
+    def modes(self) -> list[str]:
+        return list(self._boards)
+
+    async def stale_modes(self, modes: Iterable[str]) -> list[str]:
+        with self._lock:
+            local = dict(self._versions)
+        return [mode for mode in modes if local[mode] != await self.backend.version(mode)]
+
+    def synced_at(self, mode: str, generation: int) -> Optional[int]:
+        """When the board last matched the database, or None if it must be loaded in full."""
+        with self._lock:
+            if self._generations[mode] != generation:
+                return None
+            return self._synced_at[mode]
+
+    def load(
+        self,
+        mode: str,
+        version: int,
+        rows: Iterable[tuple[LeaderboardKey, Any]],
+        generation: int = 0,
+        synced_at: Optional[int] = None,
+    ) -> None:
+        board = RankedLeaderboard()
+        board.load(rows)
+        with self._lock:
+            self._boards[mode] = board
+            self._versions[mode] = version
+            self._generations[mode] = generation
+            self._synced_at[mode] = synced_at if synced_at is not None else self._clock()
+
+    def catch_up(self, mode: str, version: int, rows: Iterable[tuple[LeaderboardKey, Any]], synced_at: int) -> int:
+        """Add the entries of ``rows`` the board does not hold yet and return how many."""
+        added = 0
+        with self._lock:
+            board = self._boards[mode]
+            for key, entry in rows:
+                if key not in board:
+                    board.insert(key, entry)
+                    added += 1
+            self._versions[mode] = version
+            self._synced_at[mode] = synced_at
+        return added
+
+    def insert(self, mode: str, key: LeaderboardKey, entry: Any, version: int) -> None:
+        self.insert_many(mode, [(key, entry)], version)
+
+    def insert_many(self, mode: str, rows: Iterable[tuple[LeaderboardKey, Any]], version: int) -> None:
+        """Apply a committed write that moved the backend to ``version``.
+
+        If the board did not sit at the preceding version it is left stale
+        and picked up by the next reload instead.
+        """
+        with self._lock:
+            if self._versions[mode] != version - 1:
+                return
+            board = self._boards[mode]
+            for key, entry in rows:
+                board.insert(key, entry)
+            self._versions[mode] = version
+            # No other write came in between, so the board matches the database as of now.
+            self._synced_at[mode] = self._clock()
+
+    def page(
+        self,
+        modes: Iterable[str],
+        after: Optional[LeaderboardKey],
+        limit: int,
+    ) -> list[tuple[LeaderboardKey, Any]]:
+        """Return up to ``limit`` entries following ``after`` across ``modes``."""
+        with self._lock:
+            iterators = [self._boards[mode].iter_after(after) for mode in modes]
+            merged = iterators[0] if len(iterators) == 1 else heapq.merge(*iterators, key=lambda row: row[0])
+            return list(islice(merged, limit))
+
+    def rank(self, username: str, modes: Iterable[str]) -> Optional[tuple[int, int, int]]:
+        """Return ``(rank, best score, total entries)`` for ``username`` across ``modes``.
+
+        The rank is the position of the player's best entry, with ties sharing a rank.
+        """
+        with self._lock:
+            boards = [self._boards[mode] for mode in modes]
+            bests = [board.ranks.best(username) for board in boards]
+            known = [best for best in bests if best is not None]
+            if not known:
+                return None
+            best = max(known)
+            above = sum(board.ranks.count_above(best) for board in boards)
+            total = sum(len(board) for board in boards)
+        return above + 1, best, total
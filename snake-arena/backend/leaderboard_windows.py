@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+
+
+class LeaderboardWindow(str, Enum):
+    daily = "daily"
+    weekly = "weekly"
+    all_time = "all-time"
+
+
+# Scores land in an hour bucket holding each player's best in that hour. Once
+# the hour is over, compaction folds it into the bucket of its day and of its
+# week. A window is then answered from one rolled-up bucket plus the few hour
+# buckets not yet compacted, whatever the size of the history.
+HOUR = "hour"
+DAY = "day"
+WEEK = "week"
+
+ROLLUP_TARGETS = (DAY, WEEK)
+WINDOW_GRANULARITY = {LeaderboardWindow.daily: DAY, LeaderboardWindow.weekly: WEEK}
+
+
+def bucket_start(granularity: str, moment: datetime) -> datetime:
+    """Start of the UTC hour, day or ISO week (from Monday) containing ``moment``."""
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    if granularity == HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        return day
+    if granularity == WEEK:
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown bucket granularity: {granularity}")
+
+
+def window_start(window: LeaderboardWindow, now: datetime) -> datetime:
+    return bucket_start(WINDOW_GRANULARITY[window], now)
+
+
+def beats(score: int, played_at: datetime, other_score: int, other_played_at: datetime) -> bool:
+    """Whether a result displaces another as a player's best: higher, or as high but earlier."""
+    return score > other_score or (score == other_score and played_at < other_played_at)
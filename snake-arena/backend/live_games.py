@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+GRID_SIZE = 20
+INITIAL_SNAKE = ((10, 10), (9, 10), (8, 10))
+FOOD_SCORE = 10
+
+MOVES = {
+    "UP": (0, -1),
+    "DOWN": (0, 1),
+    "LEFT": (-1, 0),
+    "RIGHT": (1, 0),
+}
+OPPOSITES = {"UP": "DOWN", "DOWN": "UP", "LEFT": "RIGHT", "RIGHT": "LEFT"}
+
+
+def pack(x: int, y: int) -> int:
+    return y * GRID_SIZE + x
+
+
+def unpack(cell: int) -> dict[str, int]:
+    y, x = divmod(cell, GRID_SIZE)
+    return {"x": x, "y": y}
+
+
+class LiveGame:
+    """One server-side snake game, following the rules in the frontend's gameLogic.ts.
+
+    The body is a deque of packed cells, head first, mirrored by a set for
+    O(1) collision checks; moving costs one appendleft and one pop.
+    """
+
+    def __init__(self, game_id: str, username: str, mode: str, owner_token: str, rng: random.Random) -> None:
+        self.id = game_id
+        self.username = username
+        self.mode = mode
+        self.owner_token = owner_token
+        self.direction = "RIGHT"
+        self.score = 0
+        self.is_playing = True
+        # Bumped on every change of state; identifies a snapshot for HTTP caching.
+        self.version = 0
+        # When the player last started or steered the game, on the registry's clock.
+        self.touched_at = 0.0
+        self.body: deque[int] = deque(pack(x, y) for x, y in INITIAL_SNAKE)
+        self.cells = set(self.body)
+        self._rng = rng
+        self.food = self._spawn_food()
+
+    def turn(self, direction: str) -> None:
+        if direction != OPPOSITES[self.direction]:
+            self.direction = direction
+
+    def tick(self) -> None:
+        if not self.is_playing:
+            return
+        y, x = divmod(self.body[0], GRID_SIZE)
+        dx, dy = MOVES[self.direction]
+        x, y = x + dx, y + dy
+        if self.mode == "pass-through":
+            x %= GRID_SIZE
+            y %= GRID_SIZE
+        elif not (0 <= x < GRID_SIZE and 0 <= y < GRID_SIZE):
+            self.is_playing = False
+            return
+
+        head = pack(x, y)
+        if head in self.cells and head != self.body[-1]:
+            self.is_playing = False
+            return
+
+        ate_food = head == self.food
+        if not ate_food:
+            self.cells.discard(self.body.pop())
+        self.body.appendleft(head)
+        self.cells.add(head)
+        if ate_food:
+            self.score += FOOD_SCORE
+            self.food = self._spawn_food()
+
+    def to_state(self) -> dict:
+        return {
+            "id": self.id,
+            "username": self.username,
+            "score": self.score,
+            "mode": self.mode,
+            "snake": [unpack(cell) for cell in self.body],
+            "food": unpack(self.food),
+            "direction": self.direction,
+            "isPlaying": self.is_playing,
+        }
+
+    def _spawn_food(self) -> int:
+        if len(self.cells) >= GRID_SIZE * GRID_SIZE:
+            return self.body[0]
+        while True:
+            cell = self._rng.randrange(GRID_SIZE * GRID_SIZE)
+            if cell not in self.cells:
+                return cell
+
+
+class LiveGameRegistry:
+    """Authoritative state of games in progress, kept in memory.
+
+    Games are written to the database through ``persist`` only every
+    ``persist_interval`` seconds (just the ones that changed) instead of on
+    every move. Games that end, or that the player abandons, are dropped from
+    memory and deleted through ``remove``.
+    """
+
+    def __init__(
+        self,
+        persist: Callable[[list[dict]], Awaitable[None]],
+        remove: Callable[[list[str]], Awaitable[None]],
+        persist_interval: float,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.persist = persist
+        self.remove = remove
+        self.persist_interval = persist_interval
+        self._rng = rng or random.Random()
+        self._clock = clock
+        # Game versions only mean something within this process.
+        self.epoch = secrets.token_hex(8)
+        self._games: dict[str, LiveGame] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        # Orders database writes, so a flush already under way cannot rewrite a removed game.
+        self._writes = asyncio.Lock()
+        self._persister: Optional[asyncio.Task[None]] = None
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    def get(self, game_id: str) -> Optional[LiveGame]:
+        return self._games.get(game_id)
+
+    def states(self) -> dict[str, dict]:
+        with self._lock:
+            return {game_id: game.to_state() for game_id, game in self._games.items()}
+
+    def start(self, game_id: str, username: str, mode: str, owner_token: str) -> LiveGame:
+        game = LiveGame(game_id, username, mode, owner_token, self._rng)
+        game.touched_at = self._clock()
+        with self._lock:
+            self._games[game_id] = game
+            self._dirty.add(game_id)
+        return game
+
+    def advance(self, game: LiveGame, direction: Optional[str], steps: int) -> None:
+        with self._lock:
+            if direction:
+                game.turn(direction)
+            for _ in range(steps):
+                game.tick()
+            game.version += 1
+            game.touched_at = self._clock()
+            self._dirty.add(game.id)
+
+    async def finish(self, game: LiveGame) -> dict:
+        """Stop tracking ``game``, delete its stored snapshot and return its final state."""
+        with self._lock:
+            game.is_playing = False
+            self._games.pop(game.id, None)
+            self._dirty.discard(game.id)
+            state = game.to_state()
+        async with self._writes:
+            await self.remove([game.id])
+        return state
+
+    async def evict_idle(self, idle_timeout: float) -> list[str]:
+        """Drop games nobody has steered for ``idle_timeout`` seconds, as if they had ended."""
+        cutoff = self._clock() - idle_timeout
+        with self._lock:
+            idle = [game_id for game_id, game in self._games.items() if game.touched_at <= cutoff]
+            for game_id in idle:
+                del self._games[game_id]
+                self._dirty.discard(game_id)
+        if idle:
+            async with self._writes:
+                await self.remove(idle)
+        return idle
+
+    async def flush(self) -> int:
+        async with self._writes:
+            with self._lock:
+                states = [self._games[game_id].to_state() for game_id in self._dirty if game_id in self._games]
+                self._dirty.clear()
+            if states:
+                try:
+                    await self.persist(states)
+                except Exception:
+                    with self._lock:
+                        self._dirty.update(state["id"] for state in states if state["id"] in self._games)
+                    raise
+        return len(states)
+
+    def ensure_persisting(self) -> None:
+        if self._persister is None or self._persister.done():
+            self._persister = asyncio.create_task(self._persist_periodically())
+
+    async def _persist_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to persist live games")
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PlayerState = dict[str, Any]
+
+UPDATE_FIELDS = ("username", "score", "mode", "direction", "isPlaying")
+
+
+def encode_message(message: dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+def diff_snake(player_id: str, old: list[dict[str, int]], new: list[dict[str, int]]) -> list[dict[str, Any]]:
+    """Describe how ``old`` became ``new`` as new head segments plus dropped tail segments."""
+    if old == new:
+        return []
+    for moved in range(len(new)):
+        kept = new[moved:]
+        if kept == old[: len(kept)]:
+            events = []
+            if moved:
+                events.append({"op": "head", "id": player_id, "positions": new[:moved]})
+            dropped = len(old) - len(kept)
+            if dropped:
+                events.append({"op": "tail", "id": player_id, "count": dropped})
+            return events
+    return [{"op": "snake", "id": player_id, "snake": new}]
+
+
+def diff_live_players(previous: dict[str, PlayerState], current: dict[str, PlayerState]) -> list[dict[str, Any]]:
+    events: list[dict[str, Any]] = []
+    for player_id in previous.keys() - current.keys():
+        events.append({"op": "leave", "id": player_id})
+    for player_id, player in current.items():
+        old = previous.get(player_id)
+        if old is None:
+            events.append({"op": "join", "player": player})
+            continue
+        events.extend(diff_snake(player_id, old["snake"], player["snake"]))
+        if old["food"] != player["food"]:
+            events.append({"op": "food", "id": player_id, "position": player["food"]})
+        fields = {field: player[field] for field in UPDATE_FIELDS if old[field] != player[field]}
+        if fields:
+            events.append({"op": "update", "id": player_id, "fields": fields})
+    return events
+
+
+class LivePlayerBroadcaster:
+    """Fans live-player changes out to every subscriber.
+
+    Each subscriber receives one ``snapshot`` message and then ``delta``
+    messages. Every message is encoded once and the same string is queued for
+    all subscribers. A subscriber whose queue fills up is resynchronised with
+    a fresh snapshot instead of slowing everyone else down.
+
+    While anybody is subscribed, ``load_players`` is polled every
+    ``poll_interval`` seconds so that one query serves all spectators. The
+    first subscriber loads the initial state; anyone arriving meanwhile waits
+    for it rather than receiving an empty snapshot.
+    """
+
+    def __init__(
+        self,
+        load_players: Callable[[], Awaitable[dict[str, PlayerState]]],
+        poll_interval: float,
+        queue_size: int,
+    ) -> None:
+        self.load_players = load_players
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._players: dict[str, PlayerState] = {}
+        self._snapshot_message: Optional[str] = None
+        self._subscribers: set[asyncio.Queue[str]] = set()
+        self._poller: Optional[asyncio.Task[None]] = None
+        self._starting = asyncio.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def snapshot_message(self) -> str:
+        if self._snapshot_message is None:
+            self._snapshot_message = encode_message({"type": "snapshot", "data": list(self._players.values())})
+        return self._snapshot_message
+
+    async def subscribe(self) -> asyncio.Queue[str]:
+        async with self._starting:
+            if self._poller is None:
+                # Only start polling once the initial load has succeeded.
+                self.apply(await self.load_players())
+                self._poller = asyncio.create_task(self._poll())
+        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=self.queue_size)
+        queue.put_nowait(self.snapshot_message())
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[str]) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def apply(self, players: dict[str, PlayerState]) -> None:
+        """Replace the known state and publish whatever changed."""
+        events = diff_live_players(self._players, players)
+        self._players = players
+        if not events:
+            return
+        self._snapshot_message = None
+        self.publish(encode_message({"type": "delta", "events": events}))
+
+    def apply_player(self, player_id: str, player: Optional[PlayerState]) -> None:
+        """Publish the change to one player, or its removal when ``player`` is None."""
+        old = self._players.get(player_id)
+        events = diff_live_players(
+            {player_id: old} if old is not None else {},
+            {player_id: player} if player is not None else {},
+        )
+        if player is None:
+            self._players.pop(player_id, None)
+        else:
+            self._players[player_id] = player
+        if not events:
+            return
+        self._snapshot_message = None
+        self.publish(encode_message({"type": "delta", "events": events}))
+
+    def publish(self, message: str) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_message())
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                players = await self.load_players()
+            except Exception:
+                logger.exception("Failed to load live players")
+                continue
+            self.apply(players)
@@ -1,18 +1,88 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import binascii
+import logging
+import multiprocessing
 import os
 import secrets
-from datetime import datetime, timezone
+import time
+from dataclasses import asdict, dataclass
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Generator, Optional
-
-from fastapi import FastAPI, Request, Response
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
-from sqlalchemy import Boolean, DateTime, Integer, JSON, String, create_engine, select
+from typing import Annotated, Any, AsyncGenerator, AsyncIterable, AsyncIterator, Optional
+
+from fastapi import FastAPI, Header, Query, Request, Response, WebSocket
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    LargeBinary,
+    String,
+    and_,
+    case,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
 
+from ids import ID_LENGTH, MAX_WORKERS, IdGenerator, current_millis, first_id_at
+from http_cache import body_etag, etag_matches, make_etag, not_modified, set_cache_headers
+from leaderboard_cache import (
+    InvalidationBackend,
+    LeaderboardCache,
+    LeaderboardKey,
+    LocalInvalidationBackend,
+    leaderboard_key,
+)
+from leaderboard_windows import (
+    DAY,
+    HOUR,
+    ROLLUP_TARGETS,
+    WEEK,
+    WINDOW_GRANULARITY,
+    LeaderboardWindow,
+    beats,
+    bucket_start,
+    window_start,
+)
+from live_games import LiveGame, LiveGameRegistry
+from live_stream import LivePlayerBroadcaster, PlayerState
+from periodic import PeriodicTask
+from replays import MAX_TICKS as MAX_REPLAY_TICKS
+from replays import decode as decode_replay
+from replays import encode as encode_replay
+from replays import verify_replays
+from score_ingest import ScoreBatchQueue, ScoreSubmission
+from score_transfer import MEDIA_TYPES, aiter_lines, check_format, chunked, encode_header, encode_rows, read_records
+from session_cache import CachedUser, SessionCache
+from static_assets import PrecompressedStaticFiles, precompress
+
+# uvicorn configures only its own loggers; a child of uvicorn.error shares its
+# handler and level, so startup lines show up next to uvicorn's.
+logger = logging.getLogger("uvicorn.error").getChild(__name__)
+
 
 class Direction(str, Enum):
     up = "UP"
@@ -37,6 +107,7 @@ class User(BaseModel):
     email: EmailStr
     high_score: int = Field(alias="highScore")
     created_at: str = Field(alias="createdAt")
+    rank: Optional[int] = None
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -51,6 +122,26 @@ class LeaderboardEntry(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class PlayerRank(BaseModel):
+    username: str
+    mode: Optional[GameMode] = None
+    rank: int
+    score: int
+    total_entries: int = Field(alias="totalEntries")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class UserModeStats(BaseModel):
+    mode: GameMode
+    best_score: int = Field(alias="bestScore")
+    games_played: int = Field(alias="gamesPlayed")
+    average_score: float = Field(alias="averageScore")
+    last_played_at: str = Field(alias="lastPlayedAt")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
 class LivePlayer(BaseModel):
     id: str
     username: str
@@ -79,8 +170,11 @@ class ApiResponseUser(BaseModel):
 class ApiResponseLeaderboardList(BaseModel):
     success: bool
     data: list[LeaderboardEntry] | None = None
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")
     error: Optional[str] = None
 
+    model_config = ConfigDict(populate_by_name=True)
+
 
 class ApiResponseLeaderboardEntry(BaseModel):
     success: bool
@@ -88,6 +182,28 @@ class ApiResponseLeaderboardEntry(BaseModel):
     error: Optional[str] = None
 
 
+class ApiResponsePlayerRank(BaseModel):
+    success: bool
+    data: Optional[PlayerRank] = None
+    error: Optional[str] = None
+
+
+class ApiResponseUserStats(BaseModel):
+    success: bool
+    data: list[UserModeStats] | None = None
+    error: Optional[str] = None
+
+
+class ScoreImportResult(BaseModel):
+    rows: int
+
+
+class ApiResponseScoreImport(BaseModel):
+    success: bool
+    data: Optional[ScoreImportResult] = None
+    error: Optional[str] = None
+
+
 class ApiResponseLivePlayerList(BaseModel):
     success: bool
     data: list[LivePlayer] | None = None
@@ -106,6 +222,11 @@ class ApiResponseNull(BaseModel):
     error: Optional[str] = None
 
 
+class ApiResponseMetrics(BaseModel):
+    success: bool
+    data: dict[str, Any]
+
+
 class ApiResponseError(BaseModel):
     success: bool
     error: str
@@ -122,9 +243,51 @@ class SignupRequest(BaseModel):
     password: str
 
 
+class ReplayPayload(BaseModel):
+    """A recorded game: food seed, ticks played and ``[ticks since last change, direction]`` pairs."""
+
+    seed: int = Field(ge=0, lt=2**64)
+    ticks: int = Field(ge=1, le=MAX_REPLAY_TICKS)
+    turns: list[tuple[Annotated[int, Field(ge=0)], Direction]] = Field(default_factory=list, max_length=MAX_REPLAY_TICKS)
+
+    @field_validator("turns")
+    @classmethod
+    def first_turn_after_start(cls, turns: list[tuple[int, Direction]]) -> list[tuple[int, Direction]]:
+        # Ticks count from 1; a change at tick 0 would never be applied.
+        if turns and turns[0][0] == 0:
+            raise ValueError("the first turn must come at least one tick after the start")
+        return turns
+
+
+class ReplayStatus(BaseModel):
+    entry_id: str = Field(alias="entryId")
+    status: str
+    verified_score: Optional[int] = Field(default=None, alias="verifiedScore")
+    verified_ticks: Optional[int] = Field(default=None, alias="verifiedTicks")
+    replay: ReplayPayload
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class ApiResponseReplayStatus(BaseModel):
+    success: bool
+    data: Optional[ReplayStatus] = None
+    error: Optional[str] = None
+
+
 class SubmitScoreRequest(BaseModel):
-    score: int
+    score: int = Field(ge=0)
     mode: GameMode
+    replay: Optional[ReplayPayload] = None
+
+
+class StartLiveGameRequest(BaseModel):
+    mode: GameMode
+
+
+class LiveGameTickRequest(BaseModel):
+    direction: Optional[Direction] = None
+    steps: int = Field(default=1, ge=1, le=100)
 
 
 class Base(DeclarativeBase):
@@ -151,6 +314,12 @@ class LeaderboardEntryModel(Base):
     mode: Mapped[str] = mapped_column(String, nullable=False)
     played_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
+    __table_args__ = (
+        Index("ix_leaderboard_mode_score_played_at", "mode", score.desc(), "played_at"),
+        Index("ix_leaderboard_score_played_at", score.desc(), "played_at"),
+        Index("ix_leaderboard_username_score", "username", "score"),
+    )
+
 
 class LivePlayerModel(Base):
     __tablename__ = "live_players"
@@ -163,6 +332,68 @@ class LivePlayerModel(Base):
     food: Mapped[dict[str, int]] = mapped_column(JSON, nullable=False)
     direction: Mapped[str] = mapped_column(String, nullable=False)
     is_playing: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class LeaderboardVersionModel(Base):
+    __tablename__ = "leaderboard_versions"
+
+    mode: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    generation: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+
+class UserStatsModel(Base):
+    """Running per-mode totals for a user, kept current by score submission."""
+
+    __tablename__ = "user_stats"
+
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), primary_key=True)
+    mode: Mapped[str] = mapped_column(String, primary_key=True)
+    best_score: Mapped[int] = mapped_column(Integer, nullable=False)
+    games_played: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_score: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    last_played_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class LeaderboardBucketModel(Base):
+    """A player's best entry within one hour, day or week of one mode."""
+
+    __tablename__ = "leaderboard_buckets"
+
+    granularity: Mapped[str] = mapped_column(String, primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    mode: Mapped[str] = mapped_column(String, primary_key=True)
+    username: Mapped[str] = mapped_column(String, primary_key=True)
+    score: Mapped[int] = mapped_column(Integer, nullable=False)
+    entry_id: Mapped[str] = mapped_column(String, nullable=False)
+    played_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class ScoreReplayModel(Base):
+    """The recorded game behind a leaderboard entry, and the result of re-simulating it."""
+
+    __tablename__ = "score_replays"
+
+    entry_id: Mapped[str] = mapped_column(String, ForeignKey("leaderboard_entries.id"), primary_key=True)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # pending, verified or rejected
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    verified_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    verified_ticks: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    verified_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_score_replays_status", "status"),)
+
+
+class WorkerLeaseModel(Base):
+    """Which process currently owns a worker id for generating ids."""
+
+    __tablename__ = "worker_leases"
+
+    worker_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    owner: Mapped[str] = mapped_column(String, nullable=False)
+    renewed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
 
 class SessionModel(Base):
@@ -170,14 +401,129 @@ class SessionModel(Base):
 
     token: Mapped[str] = mapped_column(String, primary_key=True)
     email: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[Optional[str]] = mapped_column(String, ForeignKey("users.id"), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    # Null for sessions created before expiry existed; those expire SESSION_TTL after created_at.
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_sessions_email", "email"),
+        Index("ix_sessions_expires_at", "expires_at"),
+    )
 
 
-def make_engine(database_url: str):
-    connect_args = {}
-    if database_url.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-    return create_engine(database_url, connect_args=connect_args)
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "psycopg",
+}
+
+
+def to_async_database_url(database_url: str) -> str:
+    """Swap the driver in ``database_url`` for its asyncio counterpart.
+
+    ``psycopg`` (v3) serves both paths, so Postgres URLs using it are kept;
+    ``asyncpg`` can be selected explicitly with ``postgresql+asyncpg://``.
+    """
+    url = make_url(database_url)
+    backend, _, driver = url.drivername.partition("+")
+    if driver in {"aiosqlite", "asyncpg", "psycopg"}:
+        return url.render_as_string(hide_password=False)
+    async_driver = ASYNC_DRIVERS.get(backend)
+    if async_driver is None:
+        raise ValueError(f"No async driver known for {url.drivername}")
+    return url.set(drivername=f"{backend}+{async_driver}").render_as_string(hide_password=False)
+
+
+@dataclass(frozen=True)
+class EngineSettings:
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size: int = -64000
+    sqlite_mmap_size: int = 268435456
+
+    @classmethod
+    def from_env(cls) -> "EngineSettings":
+        return cls(
+            pool_size=int(os.getenv("DB_POOL_SIZE", cls.pool_size)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", cls.max_overflow)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", cls.pool_timeout)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", cls.pool_recycle)),
+            pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1" if cls.pool_pre_ping else "0") == "1",
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", cls.sqlite_journal_mode),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS", cls.sqlite_synchronous),
+            sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms)),
+            sqlite_cache_size=int(os.getenv("SQLITE_CACHE_SIZE", cls.sqlite_cache_size)),
+            sqlite_mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", cls.sqlite_mmap_size)),
+        )
+
+    def sqlite_pragmas(self) -> dict[str, str | int]:
+        return {
+            "journal_mode": self.sqlite_journal_mode,
+            "synchronous": self.sqlite_synchronous,
+            "busy_timeout": self.sqlite_busy_timeout_ms,
+            "cache_size": self.sqlite_cache_size,
+            "mmap_size": self.sqlite_mmap_size,
+        }
+
+    def describe(self, database_url: str) -> dict[str, Any]:
+        """What an engine for ``database_url`` is configured with, for logs and /metrics."""
+        url = make_url(database_url)
+        description: dict[str, Any] = {"url": url.render_as_string(hide_password=True)}
+        if url.get_backend_name() == "sqlite":
+            description["pragmas"] = self.sqlite_pragmas()
+        settings = asdict(self)
+        description["pool"] = {key: value for key, value in settings.items() if key.startswith("pool") or key == "max_overflow"}
+        return description
+
+
+def install_sqlite_pragmas(engine: Engine, settings: EngineSettings) -> None:
+    pragmas = settings.sqlite_pragmas()
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def engine_options(database_url: str, settings: EngineSettings) -> dict[str, Any]:
+    url = make_url(database_url)
+    options: dict[str, Any] = {"pool_pre_ping": settings.pool_pre_ping, "pool_recycle": settings.pool_recycle}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # In-memory databases get a single shared connection, not a sized pool.
+        if url.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+    )
+    return options
+
+
+def make_engine(database_url: str, settings: EngineSettings | None = None):
+    settings = settings or EngineSettings()
+    engine = create_engine(database_url, **engine_options(database_url, settings))
+    if engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(engine, settings)
+    return engine
+
+
+def make_async_engine(database_url: str, settings: EngineSettings | None = None):
+    settings = settings or EngineSettings()
+    async_url = to_async_database_url(database_url)
+    engine = create_async_engine(async_url, **engine_options(async_url, settings))
+    if engine.dialect.name == "sqlite":
+        install_sqlite_pragmas(engine.sync_engine, settings)
+    return engine
 
 
 def normalize_datetime(value: datetime) -> datetime:
@@ -187,57 +533,1049 @@ def normalize_datetime(value: datetime) -> datetime:
 
 
 def to_iso(value: datetime) -> str:
-    normalized = normalize_datetime(value)
-    return normalized.isoformat().replace("+00:00", "Z")
+    if value.tzinfo is not None and value.utcoffset():
+        value = value.astimezone(timezone.utc)
+    return value.replace(tzinfo=None).isoformat() + "Z"
+
+
+def encode_leaderboard_cursor(key: LeaderboardKey) -> str:
+    neg_score, played_at, entry_id = key
+    raw = f"{-neg_score}|{played_at.isoformat()}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_leaderboard_cursor(cursor: str) -> LeaderboardKey:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        score, played_at, entry_id = raw.split("|", 2)
+        return leaderboard_key(int(score), normalize_datetime(datetime.fromisoformat(played_at)), entry_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError("Invalid leaderboard cursor") from exc
 
 
-def user_to_schema(user: UserModel) -> User:
+def user_to_schema(user: UserModel | CachedUser, rank: Optional[int] = None) -> User:
     return User(
         id=user.id,
         username=user.username,
         email=user.email,
         high_score=user.high_score,
         created_at=to_iso(user.created_at),
+        rank=rank,
     )
 
 
-def leaderboard_to_schema(entry: LeaderboardEntryModel) -> LeaderboardEntry:
-    return LeaderboardEntry(
-        id=entry.id,
-        username=entry.username,
-        score=entry.score,
-        mode=GameMode(entry.mode),
-        played_at=to_iso(entry.played_at),
+def user_stats_to_schema(stats: UserStatsModel) -> UserModeStats:
+    return UserModeStats(
+        mode=GameMode(stats.mode),
+        best_score=stats.best_score,
+        games_played=stats.games_played,
+        average_score=stats.total_score / stats.games_played,
+        last_played_at=to_iso(stats.last_played_at),
+    )
+
+
+def submission_key(submission: ScoreSubmission) -> LeaderboardKey:
+    return leaderboard_key(submission.score, normalize_datetime(submission.played_at), submission.entry_id)
+
+
+def submission_to_entry(submission: ScoreSubmission) -> dict[str, Any]:
+    return leaderboard_row(
+        submission.entry_id,
+        submission.username,
+        submission.score,
+        submission.mode,
+        submission.played_at,
     )
 
 
-def live_player_to_schema(player: LivePlayerModel) -> LivePlayer:
-    return LivePlayer(
-        id=player.id,
-        username=player.username,
-        score=player.score,
-        mode=GameMode(player.mode),
-        snake=player.snake,
-        food=player.food,
-        direction=Direction(player.direction),
-        is_playing=player.is_playing,
+def submission_to_schema(submission: ScoreSubmission) -> LeaderboardEntry:
+    return LeaderboardEntry(
+        id=submission.entry_id,
+        username=submission.username,
+        score=submission.score,
+        mode=GameMode(submission.mode),
+        played_at=to_iso(submission.played_at),
     )
 
 
+# Hot read paths select these columns and build the JSON shape of LeaderboardEntry
+# and LivePlayer directly. The rows come from our own writes, which were validated
+# on the way in, so they skip pydantic and are returned through ORJSONResponse.
+LEADERBOARD_COLUMNS = (
+    LeaderboardEntryModel.id,
+    LeaderboardEntryModel.username,
+    LeaderboardEntryModel.score,
+    LeaderboardEntryModel.mode,
+    LeaderboardEntryModel.played_at,
+)
+LIVE_PLAYER_COLUMNS = (
+    LivePlayerModel.id,
+    LivePlayerModel.username,
+    LivePlayerModel.score,
+    LivePlayerModel.mode,
+    LivePlayerModel.snake,
+    LivePlayerModel.food,
+    LivePlayerModel.direction,
+    LivePlayerModel.is_playing,
+)
+
+
+def leaderboard_row(entry_id: str, username: str, score: int, mode: str, played_at: datetime) -> dict[str, Any]:
+    return {"id": entry_id, "username": username, "score": score, "mode": mode, "playedAt": to_iso(played_at)}
+
+
+def live_player_row(
+    player_id: str,
+    username: str,
+    score: int,
+    mode: str,
+    snake: list[dict],
+    food: dict,
+    direction: str,
+    is_playing: bool,
+) -> dict[str, Any]:
+    return {
+        "id": player_id,
+        "username": username,
+        "score": score,
+        "mode": mode,
+        "snake": snake,
+        "food": food,
+        "direction": direction,
+        "isPlaying": is_playing,
+    }
+
+
+def row_key(row: tuple) -> LeaderboardKey:
+    entry_id, _, score, _, played_at = row
+    return leaderboard_key(score, normalize_datetime(played_at), entry_id)
+
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./snake_arena.db")
-engine = make_engine(DATABASE_URL)
+LEADERBOARD_DEFAULT_LIMIT = int(os.getenv("LEADERBOARD_DEFAULT_LIMIT", "100"))
+LEADERBOARD_MAX_LIMIT = int(os.getenv("LEADERBOARD_MAX_LIMIT", "1000"))
+LEADERBOARD_CACHE_ENABLED = os.getenv("LEADERBOARD_CACHE_ENABLED", "1") == "1"
+LEADERBOARD_CACHE_BACKEND = os.getenv("LEADERBOARD_CACHE_BACKEND", "local")
+LEADERBOARD_CACHE_POLL_INTERVAL = float(os.getenv("LEADERBOARD_CACHE_POLL_INTERVAL", "1.0"))
+LEADERBOARD_CATCH_UP_MARGIN_MS = int(os.getenv("LEADERBOARD_CATCH_UP_MARGIN_MS", "5000"))
+LIVE_PLAYERS_POLL_INTERVAL = float(os.getenv("LIVE_PLAYERS_POLL_INTERVAL", "0.5"))
+LIVE_PLAYERS_QUEUE_SIZE = int(os.getenv("LIVE_PLAYERS_QUEUE_SIZE", "64"))
+LIVE_GAME_PERSIST_INTERVAL = float(os.getenv("LIVE_GAME_PERSIST_INTERVAL", "5.0"))
+LIVE_GAME_IDLE_TIMEOUT = float(os.getenv("LIVE_GAME_IDLE_TIMEOUT", "300"))
+LIVE_GAME_SWEEP_INTERVAL = float(os.getenv("LIVE_GAME_SWEEP_INTERVAL", "60"))
+SCORE_INGEST_MODE = os.getenv("SCORE_INGEST_MODE", "direct")
+SCORE_BATCH_MAX_SIZE = int(os.getenv("SCORE_BATCH_MAX_SIZE", "100"))
+SCORE_BATCH_MAX_DELAY_MS = float(os.getenv("SCORE_BATCH_MAX_DELAY_MS", "10"))
+SCORE_QUEUE_SIZE = int(os.getenv("SCORE_QUEUE_SIZE", "1000"))
+WORKER_ID = os.getenv("WORKER_ID", "")
+WORKER_LEASE_TTL = float(os.getenv("WORKER_LEASE_TTL", "60"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+SCORE_TRANSFER_CHUNK_SIZE = int(os.getenv("SCORE_TRANSFER_CHUNK_SIZE", "5000"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "60"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(30 * 24 * 3600)))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "1000"))
+LEADERBOARD_HTTP_MAX_AGE = int(os.getenv("LEADERBOARD_HTTP_MAX_AGE", "0"))
+LEADERBOARD_BUCKET_COMPACT_INTERVAL = float(os.getenv("LEADERBOARD_BUCKET_COMPACT_INTERVAL", "60"))
+LEADERBOARD_BUCKET_COMPACT_BATCH = int(os.getenv("LEADERBOARD_BUCKET_COMPACT_BATCH", "1000"))
+LEADERBOARD_DAY_BUCKET_RETENTION_DAYS = int(os.getenv("LEADERBOARD_DAY_BUCKET_RETENTION_DAYS", "7"))
+LEADERBOARD_WEEK_BUCKET_RETENTION_WEEKS = int(os.getenv("LEADERBOARD_WEEK_BUCKET_RETENTION_WEEKS", "4"))
+LIVE_PLAYER_HTTP_MAX_AGE = int(os.getenv("LIVE_PLAYER_HTTP_MAX_AGE", "0"))
+REPLAY_VERIFY_WORKERS = int(os.getenv("REPLAY_VERIFY_WORKERS", str(os.cpu_count() or 1)))
+REPLAY_VERIFY_INTERVAL = float(os.getenv("REPLAY_VERIFY_INTERVAL", "1.0"))
+REPLAY_VERIFY_BATCH = int(os.getenv("REPLAY_VERIFY_BATCH", "512"))
+# Request handlers use the async engine; the sync one serves startup, scripts and tests.
+ENGINE_SETTINGS = EngineSettings.from_env()
+engine = make_engine(DATABASE_URL, ENGINE_SETTINGS)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+async_engine = make_async_engine(DATABASE_URL, ENGINE_SETTINGS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+class DatabaseInvalidationBackend(InvalidationBackend):
+    """Version counters in the shared database, for running several workers.
+
+    Versions are re-read at most once per ``poll_interval`` seconds, so other
+    workers' writes become visible within that window.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], poll_interval: float) -> None:
+        self._session_factory = session_factory
+        self._poll_interval = poll_interval
+        self._versions: dict[str, int] = {}
+        self._generations: dict[str, int] = {}
+        self._fetched_at = float("-inf")
+
+    async def version(self, mode: str) -> int:
+        await self._poll()
+        return self._versions.get(mode, 0)
+
+    async def generation(self, mode: str) -> int:
+        await self._poll()
+        return self._generations.get(mode, 0)
+
+    async def _poll(self) -> None:
+        if time.monotonic() - self._fetched_at >= self._poll_interval:
+            async with self._session_factory() as db:
+                rows = (await db.execute(select(LeaderboardVersionModel))).scalars().all()
+            self._versions = {row.mode: row.version for row in rows}
+            self._generations = {row.mode: row.generation for row in rows}
+            self._fetched_at = time.monotonic()
+
+    async def bump(self, mode: str) -> int:
+        # One upsert, so workers creating a mode's row at the same time both succeed.
+        async with self._session_factory() as db:
+            stmt = upsert_statement(db.bind.dialect.name, LeaderboardVersionModel).values(mode=mode, version=1)
+            version = await db.scalar(
+                stmt.on_conflict_do_update(
+                    index_elements=[LeaderboardVersionModel.mode],
+                    set_={"version": LeaderboardVersionModel.version + 1},
+                ).returning(LeaderboardVersionModel.version)
+            )
+            await db.commit()
+        self._versions[mode] = version
+        return version
+
+    async def reset(self, mode: str) -> int:
+        async with self._session_factory() as db:
+            stmt = upsert_statement(db.bind.dialect.name, LeaderboardVersionModel).values(mode=mode, version=1, generation=1)
+            version, generation = (
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[LeaderboardVersionModel.mode],
+                        set_={
+                            "version": LeaderboardVersionModel.version + 1,
+                            "generation": LeaderboardVersionModel.generation + 1,
+                        },
+                    ).returning(LeaderboardVersionModel.version, LeaderboardVersionModel.generation)
+                )
+            ).one()
+            await db.commit()
+        self._versions[mode] = version
+        self._generations[mode] = generation
+        return version
+
+
+session_cache = SessionCache(max_size=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+
+# Without a fixed WORKER_ID, a worker id is leased from the database on startup.
+id_generator = IdGenerator(int(WORKER_ID) if WORKER_ID else None)
+worker_lease_owner = secrets.token_hex(8)
+
+
+async def claim_worker_id() -> int:
+    """Lease the lowest worker id that no live process holds.
+
+    Leases not renewed within ``WORKER_LEASE_TTL`` seconds are taken over.
+    Concurrent claims are settled by the primary key (for new rows) or by
+    matching the old renewal time (for takeovers); the loser tries again.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        expired_before = now - timedelta(seconds=WORKER_LEASE_TTL)
+        async with AsyncSessionLocal() as db:
+            leases = {lease.worker_id: lease for lease in (await db.execute(select(WorkerLeaseModel))).scalars()}
+            candidate = next(
+                (
+                    worker_id
+                    for worker_id in range(MAX_WORKERS)
+                    if worker_id not in leases or normalize_datetime(leases[worker_id].renewed_at) < expired_before
+                ),
+                None,
+            )
+            if candidate is None:
+                raise RuntimeError(f"All {MAX_WORKERS} worker ids are leased")
+            try:
+                if candidate in leases:
+                    result = await db.execute(
+                        update(WorkerLeaseModel)
+                        .where(
+                            WorkerLeaseModel.worker_id == candidate,
+                            WorkerLeaseModel.renewed_at == leases[candidate].renewed_at,
+                        )
+                        .values(owner=worker_lease_owner, renewed_at=now)
+                    )
+                    claimed = result.rowcount == 1
+                else:
+                    db.add(WorkerLeaseModel(worker_id=candidate, owner=worker_lease_owner, renewed_at=now))
+                    await db.flush()
+                    claimed = True
+            except IntegrityError:
+                claimed = False
+            if claimed:
+                await db.commit()
+                return candidate
+            await db.rollback()
+
+
+async def renew_worker_lease() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(WorkerLeaseModel)
+            .where(WorkerLeaseModel.worker_id == id_generator.worker_id, WorkerLeaseModel.owner == worker_lease_owner)
+            .values(renewed_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+    if result.rowcount == 0:
+        logger.error("Lost the lease on worker id %s; claiming another", id_generator.worker_id)
+        id_generator.worker_id = await claim_worker_id()
+    return id_generator.worker_id
+
+
+async def release_worker_lease() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(WorkerLeaseModel).where(WorkerLeaseModel.owner == worker_lease_owner))
+        await db.commit()
+
+
+worker_lease = PeriodicTask("worker id lease", renew_worker_lease, interval=WORKER_LEASE_TTL / 3)
+
+
+def make_invalidation_backend(name: str) -> InvalidationBackend:
+    if name == "local":
+        return LocalInvalidationBackend()
+    if name == "database":
+        return DatabaseInvalidationBackend(AsyncSessionLocal, LEADERBOARD_CACHE_POLL_INTERVAL)
+    raise ValueError(f"Unknown leaderboard cache backend: {name}")
+
+
+leaderboard_cache = LeaderboardCache(
+    [mode.value for mode in GameMode],
+    make_invalidation_backend(LEADERBOARD_CACHE_BACKEND),
+)
 
 
 api_app = FastAPI(title="Snake Arena API")
 
 
-def get_db() -> Generator[Session, None, None]:
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+# One refresh per mode at a time: requests that find a board stale wait for
+# the refresh already running instead of each starting their own.
+leaderboard_refresh_locks = {mode: asyncio.Lock() for mode in leaderboard_cache.modes}
+
+
+async def refresh_leaderboard_cache(modes: list[str]) -> None:
+    """Bring the given modes up to date with the database."""
+    for mode in modes:
+        async with leaderboard_refresh_locks[mode]:
+            await sync_leaderboard_mode(mode)
+
+
+async def sync_leaderboard_mode(mode: str) -> None:
+    """Load ``mode`` in full, or catch it up with the entries created since its last sync.
+
+    Ids sort by creation time, so catching up reads only ids issued since
+    ``LEADERBOARD_CATCH_UP_MARGIN_MS`` before the last sync (the margin covers
+    clock skew between workers and ids committed a little after they were
+    issued); entries the board already holds are skipped. Imports with ids of
+    their own reset the generation, which forces a full load.
+    """
+    started = current_millis()
+    backend = leaderboard_cache.backend
+    # Read the version first so that writes racing with the sync leave the board stale.
+    version = await backend.version(mode)
+    generation = await backend.generation(mode)
+    synced_at = leaderboard_cache.synced_at(mode, generation)
+    stmt = select(*LEADERBOARD_COLUMNS).where(LeaderboardEntryModel.mode == mode)
+    async with AsyncSessionLocal() as db:
+        if synced_at is None:
+            stmt = stmt.order_by(
+                LeaderboardEntryModel.score.desc(),
+                LeaderboardEntryModel.played_at,
+                LeaderboardEntryModel.id,
+            ).execution_options(yield_per=1000)
+            result = await db.stream(stmt)
+            rows = [(row_key(row), leaderboard_row(*row)) async for row in result]
+            leaderboard_cache.load(mode, version, rows, generation, synced_at=started)
+            return
+        stmt = stmt.where(
+            LeaderboardEntryModel.id >= first_id_at(synced_at - LEADERBOARD_CATCH_UP_MARGIN_MS),
+            func.length(LeaderboardEntryModel.id) == ID_LENGTH,
+        )
+        rows = [(row_key(row), leaderboard_row(*row)) for row in (await db.execute(stmt)).all()]
+    leaderboard_cache.catch_up(mode, version, rows, synced_at=started)
+
+
+async def ensure_leaderboard_cache_fresh(modes: list[str]) -> None:
+    for mode in await leaderboard_cache.stale_modes(modes):
+        async with leaderboard_refresh_locks[mode]:
+            # The refresh this request waited for may have caught the board up already.
+            if await leaderboard_cache.stale_modes([mode]):
+                await sync_leaderboard_mode(mode)
+
+
+async def lookup_player_rank(username: str, mode: GameMode | None) -> Optional[PlayerRank]:
+    if LEADERBOARD_CACHE_ENABLED:
+        modes = [mode.value] if mode else leaderboard_cache.modes
+        await ensure_leaderboard_cache_fresh(modes)
+        result = leaderboard_cache.rank(username, modes)
+    else:
+        async with AsyncSessionLocal() as db:
+            result = await query_player_rank(db, username, mode)
+    if result is None:
+        return None
+    rank, score, total = result
+    return PlayerRank(username=username, mode=mode, rank=rank, score=score, total_entries=total)
+
+
+async def lookup_user_rank(username: str) -> Optional[int]:
+    """Overall rank only, for /auth/me: without the cache, counting every entry would cost a full scan."""
+    if LEADERBOARD_CACHE_ENABLED:
+        player_rank = await lookup_player_rank(username, None)
+        return player_rank.rank if player_rank else None
+    async with AsyncSessionLocal() as db:
+        result = await query_player_rank(db, username, None, with_total=False)
+    return result[0] if result else None
+
+
+async def query_player_rank(
+    db: AsyncSession,
+    username: str,
+    mode: GameMode | None,
+    with_total: bool = True,
+) -> Optional[tuple[int, int, Optional[int]]]:
+    mode_filter = [LeaderboardEntryModel.mode == mode.value] if mode else []
+    best = await db.scalar(
+        select(func.max(LeaderboardEntryModel.score)).where(LeaderboardEntryModel.username == username, *mode_filter)
+    )
+    if best is None:
+        return None
+    above = await db.scalar(
+        select(func.count()).select_from(LeaderboardEntryModel).where(LeaderboardEntryModel.score > best, *mode_filter)
+    )
+    total = await db.scalar(select(func.count()).select_from(LeaderboardEntryModel).where(*mode_filter)) if with_total else None
+    return above + 1, best, total
+
+
+def ranks_after(score: Any, played_at: Any, entry_id: Any, after: LeaderboardKey) -> Any:
+    """Keyset condition for rows ordered after ``after`` (score descending, then played_at, then id)."""
+    neg_score, after_played_at, after_id = after
+    return or_(
+        score < -neg_score,
+        and_(score == -neg_score, played_at > after_played_at),
+        and_(score == -neg_score, played_at == after_played_at, entry_id > after_id),
+    )
+
+
+async def query_leaderboard_page(
+    db: AsyncSession,
+    mode: GameMode | None,
+    after: LeaderboardKey | None,
+    limit: int,
+) -> list[tuple[LeaderboardKey, dict[str, Any]]]:
+    stmt = select(*LEADERBOARD_COLUMNS)
+    if mode:
+        stmt = stmt.where(LeaderboardEntryModel.mode == mode.value)
+    if after:
+        stmt = stmt.where(
+            ranks_after(LeaderboardEntryModel.score, LeaderboardEntryModel.played_at, LeaderboardEntryModel.id, after)
+        )
+    stmt = stmt.order_by(
+        LeaderboardEntryModel.score.desc(),
+        LeaderboardEntryModel.played_at,
+        LeaderboardEntryModel.id,
+    ).limit(limit)
+    rows = (await db.execute(stmt)).all()
+    return [(row_key(row), leaderboard_row(*row)) for row in rows]
+
+
+async def persist_live_games(states: list[PlayerState]) -> None:
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        for state in states:
+            await db.merge(
+                LivePlayerModel(
+                    id=state["id"],
+                    username=state["username"],
+                    score=state["score"],
+                    mode=state["mode"],
+                    snake=state["snake"],
+                    food=state["food"],
+                    direction=state["direction"],
+                    is_playing=state["isPlaying"],
+                    updated_at=now,
+                )
+            )
+        await db.commit()
+
+
+async def remove_live_games(game_ids: list[str]) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(LivePlayerModel).where(LivePlayerModel.id.in_(game_ids)))
+        await db.commit()
+
+
+live_games = LiveGameRegistry(persist_live_games, remove_live_games, persist_interval=LIVE_GAME_PERSIST_INTERVAL)
+
+
+async def sweep_idle_live_games() -> dict[str, int]:
+    """Drop games idle for ``LIVE_GAME_IDLE_TIMEOUT`` here, and stale snapshots from any worker.
+
+    A snapshot is stale when it shows a finished game or has not been written
+    for the idle timeout, which covers games whose worker stopped before
+    ending them. Snapshots without ``updated_at`` (the seeded demo players)
+    are kept.
+    """
+    evicted = await live_games.evict_idle(LIVE_GAME_IDLE_TIMEOUT)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=LIVE_GAME_IDLE_TIMEOUT)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(LivePlayerModel).where(or_(LivePlayerModel.is_playing.is_(False), LivePlayerModel.updated_at < cutoff))
+        )
+        await db.commit()
+    return {"evicted": len(evicted), "deleted": result.rowcount}
+
+
+live_game_sweeper = PeriodicTask("idle live game sweep", sweep_idle_live_games, interval=LIVE_GAME_SWEEP_INTERVAL)
+
+
+async def load_live_player_states() -> dict[str, PlayerState]:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(*LIVE_PLAYER_COLUMNS).where(LivePlayerModel.is_playing.is_(True)))).all()
+    states = {row[0]: live_player_row(*row) for row in rows}
+    # Games in progress are ahead of their last persisted snapshot.
+    states.update(live_games.states())
+    return states
+
+
+live_broadcaster = LivePlayerBroadcaster(
+    load_live_player_states,
+    poll_interval=LIVE_PLAYERS_POLL_INTERVAL,
+    queue_size=LIVE_PLAYERS_QUEUE_SIZE,
+)
+
+
+def submission_to_row(submission: ScoreSubmission) -> dict:
+    return {
+        "id": submission.entry_id,
+        "username": submission.username,
+        "score": submission.score,
+        "mode": submission.mode,
+        "played_at": submission.played_at,
+    }
+
+
+def hour_bucket_row(entry_id: str, username: str, score: int, mode: str, played_at: datetime) -> dict[str, Any]:
+    return {
+        "granularity": HOUR,
+        "bucket_start": bucket_start(HOUR, played_at),
+        "mode": mode,
+        "username": username,
+        "score": score,
+        "entry_id": entry_id,
+        "played_at": played_at,
+    }
+
+
+async def raise_high_scores(db: AsyncSession, submissions: list[ScoreSubmission]) -> list[str]:
+    """Raise high scores to the best of ``submissions`` and return the ids of users whose score went up."""
+    best_by_user: dict[str, int] = {}
+    for submission in submissions:
+        best_by_user[submission.user_id] = max(submission.score, best_by_user.get(submission.user_id, submission.score))
+    if not best_by_user:
+        return []
+    # One statement for the whole batch: each user's best, looked up by id.
+    best = case(best_by_user, value=UserModel.id)
+    result = await db.execute(
+        update(UserModel)
+        .where(UserModel.id.in_(best_by_user), UserModel.high_score < best)
+        .values(high_score=best)
+        .returning(UserModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+async def insert_scores(db: AsyncSession, submissions: list[ScoreSubmission]) -> list[str]:
+    """Insert ``submissions`` and return the ids of users whose high score went up."""
+    await db.execute(insert(LeaderboardEntryModel), [submission_to_row(submission) for submission in submissions])
+    updated = await raise_high_scores(db, submissions)
+    replays = [
+        {"entry_id": submission.entry_id, "data": submission.replay, "status": "pending"}
+        for submission in submissions
+        if submission.replay is not None
+    ]
+    if replays:
+        await db.execute(insert(ScoreReplayModel), replays)
+    await upsert_user_stats(db, submissions)
+    await upsert_leaderboard_buckets(
+        db,
+        [
+            hour_bucket_row(submission.entry_id, submission.username, submission.score, submission.mode, submission.played_at)
+            for submission in submissions
+        ],
+    )
+    return updated
+
+
+def upsert_statement(dialect_name: str, model: type[Base]):
+    if dialect_name == "postgresql":
+        return postgresql_insert(model)
+    if dialect_name == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"No upsert for database dialect {dialect_name!r}")
+
+
+async def upsert_leaderboard_buckets(db: AsyncSession, rows: list[dict[str, Any]]) -> None:
+    """Merge bucket rows into ``leaderboard_buckets``, keeping each player's best per bucket."""
+    best: dict[tuple, dict[str, Any]] = {}
+    for row in rows:
+        key = (row["granularity"], row["bucket_start"], row["mode"], row["username"])
+        current = best.get(key)
+        if current is None or beats(row["score"], row["played_at"], current["score"], current["played_at"]):
+            best[key] = row
+    if not best:
+        return
+
+    stmt = upsert_statement(db.bind.dialect.name, LeaderboardBucketModel).values(list(best.values()))
+    new = stmt.excluded
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[
+                LeaderboardBucketModel.granularity,
+                LeaderboardBucketModel.bucket_start,
+                LeaderboardBucketModel.mode,
+                LeaderboardBucketModel.username,
+            ],
+            set_={"score": new.score, "entry_id": new.entry_id, "played_at": new.played_at},
+            where=or_(
+                new.score > LeaderboardBucketModel.score,
+                and_(new.score == LeaderboardBucketModel.score, new.played_at < LeaderboardBucketModel.played_at),
+            ),
+        )
+    )
+
+
+async def compact_leaderboard_buckets(now: Optional[datetime] = None) -> dict[str, int]:
+    """Fold finished hour buckets into their day and week, then drop expired buckets.
+
+    Hours are processed ``LEADERBOARD_BUCKET_COMPACT_BATCH`` rows per
+    transaction. Keeping the best score is idempotent, so a run interrupted
+    between the roll-up and the delete is safely repeated.
+    """
+    now = now or datetime.now(timezone.utc)
+    current_hour = bucket_start(HOUR, now)
+    rolled_up = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            hours = (
+                await db.execute(
+                    select(LeaderboardBucketModel)
+                    .where(
+                        LeaderboardBucketModel.granularity == HOUR,
+                        LeaderboardBucketModel.bucket_start < current_hour,
+                    )
+                    .limit(LEADERBOARD_BUCKET_COMPACT_BATCH)
+                )
+            ).scalars().all()
+            if not hours:
+                break
+            await upsert_leaderboard_buckets(
+                db,
+                [
+                    {
+                        "granularity": granularity,
+                        "bucket_start": bucket_start(granularity, hour.bucket_start),
+                        "mode": hour.mode,
+                        "username": hour.username,
+                        "score": hour.score,
+                        "entry_id": hour.entry_id,
+                        "played_at": hour.played_at,
+                    }
+                    for hour in hours
+                    for granularity in ROLLUP_TARGETS
+                ],
+            )
+            await db.execute(
+                delete(LeaderboardBucketModel)
+                .where(
+                    LeaderboardBucketModel.granularity == HOUR,
+                    tuple_(
+                        LeaderboardBucketModel.bucket_start,
+                        LeaderboardBucketModel.mode,
+                        LeaderboardBucketModel.username,
+                    ).in_([(hour.bucket_start, hour.mode, hour.username) for hour in hours]),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            rolled_up += len(hours)
+
+        expired = 0
+        retention = {
+            DAY: bucket_start(DAY, now) - timedelta(days=LEADERBOARD_DAY_BUCKET_RETENTION_DAYS),
+            WEEK: bucket_start(WEEK, now) - timedelta(weeks=LEADERBOARD_WEEK_BUCKET_RETENTION_WEEKS),
+        }
+        for granularity, cutoff in retention.items():
+            result = await db.execute(
+                delete(LeaderboardBucketModel).where(
+                    LeaderboardBucketModel.granularity == granularity,
+                    LeaderboardBucketModel.bucket_start < cutoff,
+                )
+            )
+            expired += result.rowcount
+        await db.commit()
+    return {"rolledUp": rolled_up, "expired": expired}
+
+
+async def export_scores(fmt: str, chunk_size: int = SCORE_TRANSFER_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Stream every leaderboard entry encoded as ``fmt``, one fetched chunk at a time."""
+    yield encode_header(fmt)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(select(*LEADERBOARD_COLUMNS).execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield encode_rows((leaderboard_row(*row) for row in rows), fmt)
+
+
+async def import_scores(
+    records: AsyncIterable[dict[str, Any]],
+    chunk_size: int = SCORE_TRANSFER_CHUNK_SIZE,
+    backend: Optional[InvalidationBackend] = None,
+) -> int:
+    """Insert ``records`` ``chunk_size`` rows per statement and return how many were read.
+
+    Each chunk commits on its own, together with the high scores, user stats
+    and window buckets of the rows it actually inserted. Ids that already
+    exist are skipped, so an interrupted import can be run again. Once done,
+    the leaderboard versions of the imported modes are reset on ``backend``
+    (the cache's own by default).
+    """
+    backend = backend or leaderboard_cache.backend
+    read = 0
+    modes: set[str] = set()
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            upsert_statement(db.bind.dialect.name, LeaderboardEntryModel)
+            .on_conflict_do_nothing(index_elements=[LeaderboardEntryModel.id])
+            .returning(*LEADERBOARD_COLUMNS)
+        )
+        try:
+            async for chunk in chunked(records, chunk_size):
+                inserted = (await db.execute(stmt, chunk)).all()
+                updated_users = await fold_in_imported_scores(db, inserted)
+                await db.commit()
+                for user_id in updated_users:
+                    session_cache.invalidate_user(user_id)
+                modes.update(mode for _, _, _, mode, _ in inserted)
+                read += len(chunk)
+        finally:
+            for mode in sorted(modes):
+                # Imported ids need not sort by time, so caches reload instead of catching up.
+                await backend.reset(mode)
+    return read
+
+
+async def fold_in_imported_scores(db: AsyncSession, rows: list[tuple]) -> list[str]:
+    """Credit inserted ``LEADERBOARD_COLUMNS`` rows like submissions; return users whose high score went up.
+
+    Entries are matched to users by username; entries of unknown players,
+    or of usernames several users share, still reach the window buckets.
+    """
+    if not rows:
+        return []
+    usernames = {username for _, username, _, _, _ in rows}
+    matches = await db.execute(
+        select(UserModel.username, func.min(UserModel.id), func.count())
+        .where(UserModel.username.in_(usernames))
+        .group_by(UserModel.username)
+    )
+    user_ids = {}
+    for username, user_id, users in matches:
+        if users == 1:
+            user_ids[username] = user_id
+        else:
+            logger.warning("Not crediting imported scores of %r: %d users share that username", username, users)
+    submissions = [
+        ScoreSubmission(
+            entry_id=entry_id,
+            user_id=user_ids[username],
+            username=username,
+            score=score,
+            mode=mode,
+            played_at=normalize_datetime(played_at),
+        )
+        for entry_id, username, score, mode, played_at in rows
+        if username in user_ids
+    ]
+    updated = await raise_high_scores(db, submissions)
+    if submissions:
+        await upsert_user_stats(db, submissions)
+    # Windows never reach back past the current week; older hours would only be rolled up and expired.
+    since = bucket_start(WEEK, datetime.now(timezone.utc))
+    await upsert_leaderboard_buckets(
+        db,
+        [
+            hour_bucket_row(entry_id, username, score, mode, normalize_datetime(played_at))
+            for entry_id, username, score, mode, played_at in rows
+            if normalize_datetime(played_at) >= since
+        ],
+    )
+    return updated
+
+
+async def sweep_expired_sessions() -> dict[str, int]:
+    """Delete expired sessions, ``SESSION_SWEEP_BATCH`` rows per transaction.
+
+    Each batch is a short transaction of its own, so logins are never locked
+    out for long however many sessions have piled up.
+    """
+    now = datetime.now(timezone.utc)
+    expired = or_(
+        SessionModel.expires_at <= now,
+        and_(SessionModel.expires_at.is_(None), SessionModel.created_at <= now - timedelta(seconds=SESSION_TTL)),
+    )
+    deleted = batches = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            tokens = (await db.execute(select(SessionModel.token).where(expired).limit(SESSION_SWEEP_BATCH))).scalars().all()
+            if not tokens:
+                break
+            await db.execute(delete(SessionModel).where(SessionModel.token.in_(tokens)))
+            await db.commit()
+        for token in tokens:
+            session_cache.invalidate(token)
+        deleted += len(tokens)
+        batches += 1
+        if len(tokens) < SESSION_SWEEP_BATCH:
+            break
+        await asyncio.sleep(0)
+    return {"deleted": deleted, "batches": batches}
+
+
+session_sweeper = PeriodicTask("expired session sweep", sweep_expired_sessions, interval=SESSION_SWEEP_INTERVAL)
+
+
+replay_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_replay_pool() -> ProcessPoolExecutor:
+    global replay_pool
+    if replay_pool is None:
+        # Workers only import replays.py and NumPy, not the app.
+        replay_pool = ProcessPoolExecutor(max_workers=REPLAY_VERIFY_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return replay_pool
+
+
+async def verify_pending_replays() -> dict[str, Any]:
+    """Re-simulate up to ``REPLAY_VERIFY_BATCH`` pending replays and record the outcome.
+
+    The batch is split across the process pool (or run in a thread when
+    ``REPLAY_VERIFY_WORKERS`` is 0). A replay is verified when the snake lasts
+    every recorded tick and ends with the entry's score.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                select(ScoreReplayModel.entry_id, ScoreReplayModel.data, LeaderboardEntryModel.mode, LeaderboardEntryModel.score)
+                .join(LeaderboardEntryModel, LeaderboardEntryModel.id == ScoreReplayModel.entry_id)
+                .where(ScoreReplayModel.status == "pending")
+                .limit(REPLAY_VERIFY_BATCH)
+            )
+        ).all()
+    if not rows:
+        return {"verified": 0, "rejected": 0, "ticks": 0, "ticksPerSecond": 0.0}
+
+    started = time.perf_counter()
+    games = [(mode, data) for _, data, mode, _ in rows]
+    if REPLAY_VERIFY_WORKERS > 0:
+        loop = asyncio.get_running_loop()
+        shares = [games[i :: REPLAY_VERIFY_WORKERS] for i in range(min(REPLAY_VERIFY_WORKERS, len(games)))]
+        outcomes = await asyncio.gather(*(loop.run_in_executor(get_replay_pool(), verify_replays, share) for share in shares))
+        # Undo the round-robin split.
+        results = [None] * len(games)
+        for i, (share_results, _) in enumerate(outcomes):
+            results[i :: len(shares)] = share_results
+    else:
+        results, _ = await asyncio.to_thread(verify_replays, games)
+    elapsed = time.perf_counter() - started
+
+    now = datetime.now(timezone.utc)
+    updates = [
+        {
+            "entry_id": entry_id,
+            "status": "verified" if result.complete and result.score == score else "rejected",
+            "verified_score": result.score,
+            "verified_ticks": result.ticks,
+            "verified_at": now,
+        }
+        for (entry_id, _, _, score), result in zip(rows, results)
+    ]
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(ScoreReplayModel), updates)
+        await db.commit()
+    rejected = sum(row["status"] == "rejected" for row in updates)
+    ticks = sum(result.ticks for result in results)
+    return {
+        "verified": len(updates) - rejected,
+        "rejected": rejected,
+        "ticks": ticks,
+        "ticksPerSecond": round(ticks / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+replay_verifier = PeriodicTask("replay verification", verify_pending_replays, interval=REPLAY_VERIFY_INTERVAL)
+
+
+bucket_compactor = PeriodicTask(
+    "leaderboard bucket compaction",
+    compact_leaderboard_buckets,
+    interval=LEADERBOARD_BUCKET_COMPACT_INTERVAL,
+)
+
+
+async def query_windowed_leaderboard(
+    db: AsyncSession,
+    window: LeaderboardWindow,
+    modes: list[str],
+    after: LeaderboardKey | None,
+    limit: int,
+    now: datetime,
+) -> list[tuple[LeaderboardKey, dict[str, Any]]]:
+    """Rank each player's best entry since the start of ``window``.
+
+    Reads the window's rolled-up bucket and any hour buckets in it that
+    compaction has not reached yet, so the cost follows the number of
+    buckets and the players in them, not the history. Picking each player's
+    best, ordering and paging all happen in the database, so only the page
+    is returned.
+    """
+    start = window_start(window, now)
+    bucket = LeaderboardBucketModel
+    # A player's best is the first of their rows in leaderboard order, as ``beats`` decides.
+    candidates = (
+        select(
+            bucket.entry_id,
+            bucket.username,
+            bucket.score,
+            bucket.mode,
+            bucket.played_at,
+            func.row_number()
+            .over(
+                partition_by=(bucket.mode, bucket.username),
+                order_by=(bucket.score.desc(), bucket.played_at, bucket.entry_id),
+            )
+            .label("position"),
+        )
+        .where(
+            bucket.mode.in_(modes),
+            or_(
+                and_(bucket.granularity == WINDOW_GRANULARITY[window], bucket.bucket_start == start),
+                and_(bucket.granularity == HOUR, bucket.bucket_start >= start),
+            ),
+        )
+        .subquery()
+    )
+    stmt = select(
+        candidates.c.entry_id,
+        candidates.c.username,
+        candidates.c.score,
+        candidates.c.mode,
+        candidates.c.played_at,
+    ).where(candidates.c.position == 1)
+    if after is not None:
+        stmt = stmt.where(ranks_after(candidates.c.score, candidates.c.played_at, candidates.c.entry_id, after))
+    stmt = stmt.order_by(candidates.c.score.desc(), candidates.c.played_at, candidates.c.entry_id).limit(limit)
+    rows = (await db.execute(stmt)).all()
+    return [(row_key(row), leaderboard_row(*row)) for row in rows]
+
+
+async def upsert_user_stats(db: AsyncSession, submissions: list[ScoreSubmission]) -> None:
+    """Fold ``submissions`` into ``user_stats`` with one upsert per batch."""
+    totals: dict[tuple[str, str], dict[str, Any]] = {}
+    for submission in submissions:
+        row = totals.setdefault(
+            (submission.user_id, submission.mode),
+            {
+                "user_id": submission.user_id,
+                "mode": submission.mode,
+                "best_score": submission.score,
+                "games_played": 0,
+                "total_score": 0,
+                "last_played_at": submission.played_at,
+            },
+        )
+        row["best_score"] = max(row["best_score"], submission.score)
+        row["games_played"] += 1
+        row["total_score"] += submission.score
+        row["last_played_at"] = max(row["last_played_at"], submission.played_at)
+
+    stmt = upsert_statement(db.bind.dialect.name, UserStatsModel).values(list(totals.values()))
+    new = stmt.excluded
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserStatsModel.user_id, UserStatsModel.mode],
+            set_={
+                "best_score": case(
+                    (new.best_score > UserStatsModel.best_score, new.best_score),
+                    else_=UserStatsModel.best_score,
+                ),
+                "games_played": UserStatsModel.games_played + new.games_played,
+                "total_score": UserStatsModel.total_score + new.total_score,
+                "last_played_at": case(
+                    (new.last_played_at > UserStatsModel.last_played_at, new.last_played_at),
+                    else_=UserStatsModel.last_played_at,
+                ),
+            },
+        )
+    )
+
+
+async def write_score_batch(submissions: list[ScoreSubmission]) -> list[Optional[Exception]]:
+    """Insert ``submissions`` in one transaction.
+
+    If the batch is rejected (e.g. a duplicate id) each submission is retried
+    on its own so that one bad row does not fail the others.
+    """
+    errors: list[Optional[Exception]] = [None] * len(submissions)
+    updated_users: list[str] = []
+    async with AsyncSessionLocal() as db:
+        try:
+            updated_users = await insert_scores(db, submissions)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            if len(submissions) == 1:
+                raise
+            for position, submission in enumerate(submissions):
+                try:
+                    updated = await insert_scores(db, [submission])
+                    await db.commit()
+                    updated_users.extend(updated)
+                except IntegrityError as exc:
+                    await db.rollback()
+                    errors[position] = exc
+
+    for user_id in updated_users:
+        session_cache.invalidate_user(user_id)
+
+    written: dict[str, list[ScoreSubmission]] = {}
+    for submission, error in zip(submissions, errors):
+        if error is None:
+            written.setdefault(submission.mode, []).append(submission)
+    for mode, mode_submissions in written.items():
+        # The version also feeds leaderboard ETags, so bump it even without the cache.
+        version = await leaderboard_cache.backend.bump(mode)
+        if LEADERBOARD_CACHE_ENABLED:
+            leaderboard_cache.insert_many(
+                mode,
+                [(submission_key(submission), submission_to_entry(submission)) for submission in mode_submissions],
+                version,
+            )
+    return errors
+
+
+score_queue = ScoreBatchQueue(
+    write_score_batch,
+    max_batch_size=SCORE_BATCH_MAX_SIZE,
+    max_delay=SCORE_BATCH_MAX_DELAY_MS / 1000,
+    queue_size=SCORE_QUEUE_SIZE,
+)
 
 
 def seed_database(db: Session) -> None:
@@ -434,41 +1772,192 @@ def seed_database(db: Session) -> None:
 
     db.add_all(users + leaderboard_entries + live_players)
     db.commit()
+    backfill_user_stats(db)
+
+
+def backfill_user_stats(db: Session, chunk_size: int = 1000) -> int:
+    """Rebuild ``user_stats`` from ``leaderboard_entries`` and return the rows written.
+
+    The database aggregates the history; the groups are streamed back and
+    written ``chunk_size`` at a time, so memory does not grow with the table.
+    Entries are matched to users by username; usernames several users share
+    are skipped and logged. Scores submitted while this runs may be lost, so
+    pause submissions first.
+    """
+    shared_usernames = select(UserModel.username).group_by(UserModel.username).having(func.count() > 1)
+    for username in db.scalars(shared_usernames):
+        logger.warning("Not backfilling stats of %r: several users share that username", username)
+    aggregated = (
+        select(
+            UserModel.id,
+            LeaderboardEntryModel.mode,
+            func.max(LeaderboardEntryModel.score),
+            func.count(),
+            func.sum(LeaderboardEntryModel.score),
+            func.max(LeaderboardEntryModel.played_at),
+        )
+        .join(UserModel, UserModel.username == LeaderboardEntryModel.username)
+        .where(UserModel.username.not_in(shared_usernames))
+        .group_by(UserModel.id, LeaderboardEntryModel.mode)
+        .execution_options(yield_per=chunk_size)
+    )
+    db.execute(UserStatsModel.__table__.delete())
+    written = 0
+    # A separate connection keeps the server-side cursor open while the session writes.
+    with db.get_bind().connect() as reader:
+        for chunk in reader.execute(aggregated).partitions():
+            db.execute(
+                insert(UserStatsModel),
+                [
+                    {
+                        "user_id": user_id,
+                        "mode": mode,
+                        "best_score": best,
+                        "games_played": games,
+                        "total_score": total,
+                        "last_played_at": last_played_at,
+                    }
+                    for user_id, mode, best, games, total, last_played_at in chunk
+                ],
+            )
+            written += len(chunk)
+    db.commit()
+    return written
+
+
+def migrate_schema(connection: Connection) -> None:
+    Base.metadata.create_all(bind=connection)
+    # Sessions created before user_id existed keep resolving through their email.
+    session_columns = {column["name"] for column in inspect(connection).get_columns("sessions")}
+    if "user_id" not in session_columns:
+        connection.exec_driver_sql("ALTER TABLE sessions ADD COLUMN user_id VARCHAR REFERENCES users (id)")
+    if "expires_at" not in session_columns:
+        connection.exec_driver_sql("ALTER TABLE sessions ADD COLUMN expires_at TIMESTAMP WITH TIME ZONE")
+    version_columns = {column["name"] for column in inspect(connection).get_columns("leaderboard_versions")}
+    if "generation" not in version_columns:
+        connection.exec_driver_sql("ALTER TABLE leaderboard_versions ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+    live_player_columns = {column["name"] for column in inspect(connection).get_columns("live_players")}
+    if "updated_at" not in live_player_columns:
+        connection.exec_driver_sql("ALTER TABLE live_players ADD COLUMN updated_at TIMESTAMP WITH TIME ZONE")
+    # create_all skips indexes on tables that already exist.
+    for index in (*LeaderboardEntryModel.__table__.indexes, *SessionModel.__table__.indexes):
+        index.create(bind=connection, checkfirst=True)
 
 
 @api_app.on_event("startup")
-def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    with SessionLocal() as db:
-        seed_database(db)
+async def on_startup() -> None:
+    logger.info("Database engine: %s", ENGINE_SETTINGS.describe(DATABASE_URL))
+    async with async_engine.begin() as connection:
+        await connection.run_sync(migrate_schema)
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(seed_database)
+    if LEADERBOARD_CACHE_ENABLED:
+        await refresh_leaderboard_cache(leaderboard_cache.modes)
+    if not WORKER_ID:
+        id_generator.worker_id = await claim_worker_id()
+        worker_lease.start()
+    bucket_compactor.start()
+    replay_verifier.start()
+    session_sweeper.start()
+    live_game_sweeper.start()
+
+
+@api_app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await bucket_compactor.stop()
+    await replay_verifier.stop()
+    await session_sweeper.stop()
+    await live_game_sweeper.stop()
+    if replay_pool is not None:
+        replay_pool.shutdown(cancel_futures=True)
+    await score_queue.close()
+    await live_games.flush()
+    if not WORKER_ID:
+        await worker_lease.stop()
+        await release_worker_lease()
+    await async_engine.dispose()
+
+
+async def load_session_user(token: str) -> Optional[CachedUser]:
+    """Resolve ``token`` with a single join, for a session cache miss."""
+    stmt = (
+        select(UserModel)
+        .join(
+            SessionModel,
+            or_(
+                SessionModel.user_id == UserModel.id,
+                and_(SessionModel.user_id.is_(None), SessionModel.email == UserModel.email),
+            ),
+        )
+        .where(SessionModel.token == token)
+        .add_columns(SessionModel.created_at, SessionModel.expires_at)
+    )
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(stmt)).first()
+    if not row:
+        return None
+    user, created_at, expires_at = row
+    expires_at = normalize_datetime(expires_at) if expires_at else normalize_datetime(created_at) + timedelta(seconds=SESSION_TTL)
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    if remaining <= 0:
+        return None
+    cached = CachedUser(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        high_score=user.high_score,
+        created_at=user.created_at,
+    )
+    session_cache.put(token, cached, ttl=remaining)
+    return cached
+
+
+async def resolve_session_user(token: str | None) -> Optional[CachedUser]:
+    if not token:
+        return None
+    return session_cache.get(token) or await load_session_user(token)
+
+
+def new_session(token: str, user: UserModel) -> SessionModel:
+    now = datetime.now(timezone.utc)
+    return SessionModel(
+        token=token,
+        email=user.email,
+        user_id=user.id,
+        created_at=now,
+        expires_at=now + timedelta(seconds=SESSION_TTL),
+    )
+
+
+def set_session_cookie(response: Response, token: str) -> None:
+    response.set_cookie("session", token, httponly=True, max_age=int(SESSION_TTL))
 
 
 @api_app.post("/auth/login", response_model=AuthResponse)
-def login(payload: LoginRequest, response: Response, request: Request) -> AuthResponse:
-    with SessionLocal() as db:
-        user = db.execute(select(UserModel).where(UserModel.email == payload.email)).scalar_one_or_none()
+async def login(payload: LoginRequest, response: Response, request: Request) -> AuthResponse:
+    async with AsyncSessionLocal() as db:
+        user = await db.scalar(select(UserModel).where(UserModel.email == payload.email))
         if not user or user.password != payload.password:
             return AuthResponse(success=False, error="Invalid email or password")
 
         token = secrets.token_urlsafe(16)
-        db.add(SessionModel(token=token, email=user.email, created_at=datetime.now(timezone.utc)))
-        db.commit()
+        db.add(new_session(token, user))
+        await db.commit()
 
-        response.set_cookie("session", token, httponly=True)
+        set_session_cookie(response, token)
         return AuthResponse(success=True, user=user_to_schema(user))
 
 
 @api_app.post("/auth/signup", response_model=AuthResponse)
-def signup(payload: SignupRequest, response: Response, request: Request) -> AuthResponse:
-    with SessionLocal() as db:
-        existing = db.execute(select(UserModel).where(UserModel.email == payload.email)).scalar_one_or_none()
+async def signup(payload: SignupRequest, response: Response, request: Request) -> AuthResponse:
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(select(UserModel).where(UserModel.email == payload.email))
         if existing:
             return AuthResponse(success=False, error="Email already exists")
 
         now = datetime.now(timezone.utc)
-        user_id = str(int(now.timestamp() * 1000))
         user = UserModel(
-            id=user_id,
+            id=id_generator.next_id(),
             username=payload.username,
             email=payload.email,
             password=payload.password,
@@ -478,118 +1967,361 @@ def signup(payload: SignupRequest, response: Response, request: Request) -> Auth
         db.add(user)
 
         token = secrets.token_urlsafe(16)
-        db.add(SessionModel(token=token, email=user.email, created_at=now))
+        db.add(new_session(token, user))
 
-        db.commit()
-        response.set_cookie("session", token, httponly=True)
+        await db.commit()
+        set_session_cookie(response, token)
         return AuthResponse(success=True, user=user_to_schema(user))
 
 
 @api_app.post("/auth/logout", response_model=ApiResponseNull)
-def logout(response: Response, request: Request) -> ApiResponseNull:
+async def logout(response: Response, request: Request) -> ApiResponseNull:
     token = request.cookies.get("session")
     if token:
-        with SessionLocal() as db:
-            session_entry = db.get(SessionModel, token)
+        session_cache.invalidate(token)
+        async with AsyncSessionLocal() as db:
+            session_entry = await db.get(SessionModel, token)
             if session_entry:
-                db.delete(session_entry)
-                db.commit()
+                await db.delete(session_entry)
+                await db.commit()
     response.delete_cookie("session")
     return ApiResponseNull(success=True, data=None)
 
 
 @api_app.get("/auth/me", response_model=ApiResponseUser)
-def get_current_user(request: Request) -> ApiResponseUser:
-    token = request.cookies.get("session")
-    if not token:
+async def get_current_user(request: Request) -> ApiResponseUser:
+    user = await resolve_session_user(request.cookies.get("session"))
+    if not user:
         return ApiResponseUser(success=True, data=None)
+    return ApiResponseUser(success=True, data=user_to_schema(user, rank=await lookup_user_rank(user.username)))
+
 
-    with SessionLocal() as db:
-        session_entry = db.get(SessionModel, token)
-        if not session_entry:
-            return ApiResponseUser(success=True, data=None)
-        user = db.execute(select(UserModel).where(UserModel.email == session_entry.email)).scalar_one_or_none()
-        return ApiResponseUser(success=True, data=user_to_schema(user) if user else None)
+@api_app.get("/users/{user_id}/stats", response_model=ApiResponseUserStats)
+async def get_user_stats(user_id: str, request: Request) -> ApiResponseUserStats:
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(select(UserStatsModel).where(UserStatsModel.user_id == user_id).order_by(UserStatsModel.mode))
+        ).scalars().all()
+    return ApiResponseUserStats(success=True, data=[user_stats_to_schema(row) for row in rows])
 
 
 @api_app.get("/leaderboard", response_model=ApiResponseLeaderboardList)
-def get_leaderboard(request: Request, mode: GameMode | None = None) -> ApiResponseLeaderboardList:
-    with SessionLocal() as db:
-        stmt = select(LeaderboardEntryModel)
-        if mode:
-            stmt = stmt.where(LeaderboardEntryModel.mode == mode.value)
-        entries = db.execute(stmt).scalars().all()
-        entries.sort(key=lambda entry: entry.score, reverse=True)
-        return ApiResponseLeaderboardList(
-            success=True,
-            data=[leaderboard_to_schema(entry) for entry in entries],
-        )
+async def get_leaderboard(
+    request: Request,
+    mode: GameMode | None = None,
+    limit: int = Query(default=LEADERBOARD_DEFAULT_LIMIT, ge=1, le=LEADERBOARD_MAX_LIMIT),
+    after: str | None = None,
+    window: LeaderboardWindow = LeaderboardWindow.all_time,
+    if_none_match: str | None = Header(default=None),
+) -> ApiResponseLeaderboardList | JSONResponse | Response:
+    after_key = None
+    if after:
+        try:
+            after_key = decode_leaderboard_cursor(after)
+        except ValueError as exc:
+            return JSONResponse(
+                status_code=400,
+                content=ApiResponseError(success=False, error=str(exc)).model_dump(),
+            )
+
+    # Every committed score bumps its mode's version, so the versions pin down the page.
+    modes = [mode.value] if mode else leaderboard_cache.modes
+    backend = leaderboard_cache.backend
+    versions = [await backend.version(name) for name in modes]
+    now = datetime.now(timezone.utc)
+    # Windows also move with the clock, independently of any write.
+    period = window_start(window, now) if window != LeaderboardWindow.all_time else None
+    etag = make_etag("leaderboard", backend.epoch, *versions, mode, limit, after, window.value, period)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, LEADERBOARD_HTTP_MAX_AGE)
+
+    # Fetch one extra row to know whether another page exists.
+    if window != LeaderboardWindow.all_time:
+        async with AsyncSessionLocal() as db:
+            rows = await query_windowed_leaderboard(db, window, modes, after_key, limit + 1, now)
+    elif LEADERBOARD_CACHE_ENABLED:
+        await ensure_leaderboard_cache_fresh(modes)
+        rows = leaderboard_cache.page(modes, after_key, limit + 1)
+    else:
+        async with AsyncSessionLocal() as db:
+            rows = await query_leaderboard_page(db, mode, after_key, limit + 1)
+
+    page = rows[:limit]
+    next_cursor = encode_leaderboard_cursor(page[-1][0]) if len(rows) > limit else None
+    response = ORJSONResponse(
+        {"success": True, "data": [entry for _, entry in page], "nextCursor": next_cursor, "error": None}
+    )
+    return set_cache_headers(response, etag, LEADERBOARD_HTTP_MAX_AGE)
+
+
+@api_app.get("/leaderboard/rank", response_model=ApiResponsePlayerRank)
+async def get_player_rank(request: Request, username: str, mode: GameMode | None = None) -> ApiResponsePlayerRank:
+    return ApiResponsePlayerRank(success=True, data=await lookup_player_rank(username, mode))
 
 
 @api_app.post("/scores", response_model=ApiResponseLeaderboardEntry)
-def submit_score(payload: SubmitScoreRequest, request: Request) -> ApiResponseLeaderboardEntry | JSONResponse:
-    token = request.cookies.get("session")
-    if not token:
+async def submit_score(payload: SubmitScoreRequest, request: Request) -> ApiResponseLeaderboardEntry | JSONResponse:
+    user = await resolve_session_user(request.cookies.get("session"))
+    if not user:
         return JSONResponse(
             status_code=401,
             content=ApiResponseError(success=False, error="Must be logged in to submit score").model_dump(),
         )
 
-    with SessionLocal() as db:
-        session_entry = db.get(SessionModel, token)
-        if not session_entry:
-            return JSONResponse(
-                status_code=401,
-                content=ApiResponseError(success=False, error="Must be logged in to submit score").model_dump(),
-            )
-        user = db.execute(select(UserModel).where(UserModel.email == session_entry.email)).scalar_one_or_none()
-        if not user:
-            return JSONResponse(
-                status_code=401,
-                content=ApiResponseError(success=False, error="Must be logged in to submit score").model_dump(),
-            )
-
-        now = datetime.now(timezone.utc)
-        entry = LeaderboardEntryModel(
-            id=str(int(now.timestamp() * 1000)),
-            username=user.username,
-            score=payload.score,
-            mode=payload.mode.value,
-            played_at=now,
+    now = datetime.now(timezone.utc)
+    submission = ScoreSubmission(
+        entry_id=id_generator.next_id(),
+        user_id=user.id,
+        username=user.username,
+        score=payload.score,
+        mode=payload.mode.value,
+        played_at=now,
+        replay=(
+            encode_replay(payload.replay.seed, payload.replay.ticks, [(delta, direction.value) for delta, direction in payload.replay.turns])
+            if payload.replay
+            else None
+        ),
+    )
+    if SCORE_INGEST_MODE == "batched":
+        await score_queue.submit(submission)
+    else:
+        (error,) = await write_score_batch([submission])
+        if error:
+            raise error
+    return ApiResponseLeaderboardEntry(success=True, data=submission_to_schema(submission))
+
+
+@api_app.get("/scores/{entry_id}/replay", response_model=ApiResponseReplayStatus)
+async def get_score_replay(entry_id: str) -> ApiResponseReplayStatus | JSONResponse:
+    async with AsyncSessionLocal() as db:
+        row = await db.get(ScoreReplayModel, entry_id)
+    if not row:
+        return JSONResponse(
+            status_code=404,
+            content=ApiResponseError(success=False, error="Replay not found").model_dump(),
         )
-        db.add(entry)
+    seed, ticks, turns = decode_replay(row.data)
+    return ApiResponseReplayStatus(
+        success=True,
+        data=ReplayStatus(
+            entry_id=entry_id,
+            status=row.status,
+            verified_score=row.verified_score,
+            verified_ticks=row.verified_ticks,
+            replay=ReplayPayload(seed=seed, ticks=ticks, turns=turns),
+        ),
+    )
+
 
-        if payload.score > user.high_score:
-            user.high_score = payload.score
+@api_app.get("/live-players", response_model=ApiResponseLivePlayerList)
+async def get_live_players(request: Request) -> ApiResponseLivePlayerList | JSONResponse:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(*LIVE_PLAYER_COLUMNS).where(LivePlayerModel.is_playing.is_(True)))).all()
+    data = {row[0]: live_player_row(*row) for row in rows}
+    data.update(live_games.states())
+    return ORJSONResponse({"success": True, "data": list(data.values()), "error": None})
+
+
+@api_app.post("/live-players", response_model=ApiResponseLivePlayer)
+async def start_live_game(payload: StartLiveGameRequest, request: Request) -> ApiResponseLivePlayer | JSONResponse:
+    token = request.cookies.get("session")
+    user = await resolve_session_user(token)
+    if not user:
+        return JSONResponse(
+            status_code=401,
+            content=ApiResponseError(success=False, error="Must be logged in to play live").model_dump(),
+        )
 
-        db.commit()
-        return ApiResponseLeaderboardEntry(success=True, data=leaderboard_to_schema(entry))
+    game = live_games.start(id_generator.next_id(), user.username, payload.mode.value, token)
+    live_games.ensure_persisting()
+    state = game.to_state()
+    live_broadcaster.apply_player(game.id, state)
+    return ApiResponseLivePlayer(success=True, data=LivePlayer.model_validate(state))
 
 
-@api_app.get("/live-players", response_model=ApiResponseLivePlayerList)
-def get_live_players(request: Request) -> ApiResponseLivePlayerList:
-    with SessionLocal() as db:
-        players = db.execute(select(LivePlayerModel)).scalars().all()
-        return ApiResponseLivePlayerList(
-            success=True,
-            data=[live_player_to_schema(player) for player in players],
+def find_owned_game(game_id: str, request: Request) -> tuple[Optional[LiveGame], Optional[JSONResponse]]:
+    game = live_games.get(game_id)
+    if not game:
+        return None, JSONResponse(
+            status_code=404,
+            content=ApiResponseError(success=False, error="Game not found").model_dump(),
         )
+    if request.cookies.get("session") != game.owner_token:
+        return None, JSONResponse(
+            status_code=403,
+            content=ApiResponseError(success=False, error="Not your game").model_dump(),
+        )
+    return game, None
+
+
+@api_app.post("/live-players/{player_id}/tick", response_model=ApiResponseLivePlayer)
+async def tick_live_game(
+    player_id: str,
+    payload: LiveGameTickRequest,
+    request: Request,
+) -> ApiResponseLivePlayer | JSONResponse:
+    game, error = find_owned_game(player_id, request)
+    if error:
+        return error
+
+    live_games.advance(game, payload.direction.value if payload.direction else None, payload.steps)
+    if game.is_playing:
+        state = game.to_state()
+    else:
+        state = await live_games.finish(game)
+    live_broadcaster.apply_player(game.id, state)
+    return ApiResponseLivePlayer(success=True, data=LivePlayer.model_validate(state))
+
+
+@api_app.post("/live-players/{player_id}/end", response_model=ApiResponseLivePlayer)
+async def end_live_game(player_id: str, request: Request) -> ApiResponseLivePlayer | JSONResponse:
+    game, error = find_owned_game(player_id, request)
+    if error:
+        return error
+
+    state = await live_games.finish(game)
+    live_broadcaster.apply_player(game.id, state)
+    return ApiResponseLivePlayer(success=True, data=LivePlayer.model_validate(state))
+
+
+@api_app.websocket("/live-players/stream")
+async def stream_live_players(websocket: WebSocket) -> None:
+    await websocket.accept()
+    receiver = asyncio.create_task(websocket.receive())
+    queue: Optional[asyncio.Queue[str]] = None
+    try:
+        queue = await live_broadcaster.subscribe()
+        while True:
+            sender = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                sender.cancel()
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                # Spectators have nothing to say; ignore anything they send.
+                receiver = asyncio.create_task(websocket.receive())
+                continue
+            await websocket.send_text(sender.result())
+    finally:
+        receiver.cancel()
+        if queue is not None:
+            live_broadcaster.unsubscribe(queue)
 
 
 @api_app.get("/live-players/{player_id}", response_model=ApiResponseLivePlayer)
-def get_live_player(player_id: str, request: Request) -> ApiResponseLivePlayer:
-    with SessionLocal() as db:
-        player = db.get(LivePlayerModel, player_id)
-        return ApiResponseLivePlayer(success=True, data=live_player_to_schema(player) if player else None)
+async def get_live_player(
+    player_id: str,
+    request: Request,
+    if_none_match: str | None = Header(default=None),
+) -> ApiResponseLivePlayer | JSONResponse | Response:
+    game = live_games.get(player_id)
+    if game:
+        # Games held here are versioned in memory: a repeat poll costs no database work.
+        etag = make_etag("live-player", live_games.epoch, player_id, game.version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, LIVE_PLAYER_HTTP_MAX_AGE)
+        response = ORJSONResponse({"success": True, "data": game.to_state(), "error": None})
+        return set_cache_headers(response, etag, LIVE_PLAYER_HTTP_MAX_AGE)
+
+    # Snapshots written by another worker carry no version, so validate by content.
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(*LIVE_PLAYER_COLUMNS).where(LivePlayerModel.id == player_id))).first()
+    if row is None:
+        return ORJSONResponse({"success": True, "data": None, "error": None})
+    response = ORJSONResponse({"success": True, "data": live_player_row(*row), "error": None})
+    etag = body_etag(response.body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, LIVE_PLAYER_HTTP_MAX_AGE)
+    return set_cache_headers(response, etag, LIVE_PLAYER_HTTP_MAX_AGE)
+
+
+def require_admin(request: Request) -> Optional[JSONResponse]:
+    token = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not ADMIN_TOKEN or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return JSONResponse(
+            status_code=403,
+            content=ApiResponseError(success=False, error="Admin token required").model_dump(),
+        )
+    return None
+
+
+@api_app.get("/admin/scores/export", response_model=None)
+async def export_scores_endpoint(
+    request: Request,
+    fmt: str = Query(default="ndjson", alias="format"),
+) -> StreamingResponse | JSONResponse:
+    denied = require_admin(request)
+    if denied:
+        return denied
+    try:
+        check_format(fmt)
+    except ValueError as exc:
+        return JSONResponse(status_code=400, content=ApiResponseError(success=False, error=str(exc)).model_dump())
+    return StreamingResponse(
+        export_scores(fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="leaderboard_entries.{fmt}"'},
+    )
+
+
+@api_app.post("/admin/scores/import", response_model=ApiResponseScoreImport)
+async def import_scores_endpoint(
+    request: Request,
+    fmt: str = Query(default="ndjson", alias="format"),
+) -> ApiResponseScoreImport | JSONResponse:
+    denied = require_admin(request)
+    if denied:
+        return denied
+    try:
+        check_format(fmt)
+        records = read_records(aiter_lines(request.stream()), fmt, {mode.value for mode in GameMode})
+        rows = await import_scores(records)
+    except ValueError as exc:
+        return JSONResponse(status_code=400, content=ApiResponseError(success=False, error=str(exc)).model_dump())
+    return ApiResponseScoreImport(success=True, data=ScoreImportResult(rows=rows))
+
+
+@api_app.get("/metrics", response_model=ApiResponseMetrics)
+async def get_metrics(request: Request) -> ApiResponseMetrics:
+    return ApiResponseMetrics(
+        success=True,
+        data={
+            "database": ENGINE_SETTINGS.describe(DATABASE_URL),
+            "ids": {"workerId": id_generator.worker_id, "lease": worker_lease.stats() if not WORKER_ID else None},
+            "sessionCache": session_cache.stats(),
+            "sessionSweeper": session_sweeper.stats(),
+            "liveGameSweeper": live_game_sweeper.stats(),
+            "leaderboardBuckets": bucket_compactor.stats(),
+            "replayVerification": replay_verifier.stats(),
+            "scoreIngest": {
+                "mode": SCORE_INGEST_MODE,
+                "batchesWritten": score_queue.batches_written,
+                "submissionsWritten": score_queue.submissions_written,
+            },
+        },
+    )
 
 
 FRONTEND_DIST = os.getenv(
     "FRONTEND_DIST",
     os.path.join(os.path.dirname(__file__), "frontend_dist"),
 )
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "1") == "1"
+
+
+async def precompress_frontend() -> None:
+    # Images built from the Dockerfile already ship the variants; this only fills gaps.
+    written = await asyncio.to_thread(precompress, FRONTEND_DIST)
+    if written:
+        logger.info("Precompressed %d frontend asset variants in %s", written, FRONTEND_DIST)
+
 
 app = FastAPI(title="Snake Arena")
 app.mount("/api", api_app)
+app.add_event_handler("startup", on_startup)
+app.add_event_handler("shutdown", on_shutdown)
 
 if os.path.isdir(FRONTEND_DIST):
-    app.mount("/", StaticFiles(directory=FRONTEND_DIST, html=True), name="frontend")
+    if STATIC_PRECOMPRESS:
+        app.add_event_handler("startup", precompress_frontend)
+    app.mount("/", PrecompressedStaticFiles(directory=FRONTEND_DIST, html=True), name="frontend")
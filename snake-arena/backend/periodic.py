@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs ``job`` every ``interval`` seconds in the background and keeps run statistics.
+
+    A failing run is logged and counted; the next one still happens on schedule.
+    """
+
+    def __init__(self, name: str, job: Callable[[], Awaitable[Any]], interval: float) -> None:
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.runs = 0
+        self.failures = 0
+        self.last_result: Any = None
+        self.last_duration = 0.0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run_once(self) -> Any:
+        started = time.perf_counter()
+        try:
+            self.last_result = await self.job()
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.runs += 1
+            self.last_duration = time.perf_counter() - started
+        return self.last_result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "lastResult": self.last_result,
+            "lastDurationMs": round(self.last_duration * 1000, 3),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
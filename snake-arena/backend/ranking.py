@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from bisect import bisect_right, insort
+from typing import Optional
+
+
+class FenwickTree:
+    """Binary indexed tree over ``size`` integer buckets."""
+
+    def __init__(self, size: int) -> None:
+        self._tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts: list[int]) -> "FenwickTree":
+        tree = cls(len(counts))
+        data = tree._tree
+        for position, count in enumerate(counts, start=1):
+            data[position] += count
+            parent = position + (position & -position)
+            if parent < len(data):
+                data[parent] += data[position]
+        return tree
+
+    @property
+    def size(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, index: int, delta: int) -> None:
+        position = index + 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def prefix_sum(self, index: int) -> int:
+        """Sum of buckets ``0..index`` inclusive."""
+        position = min(index + 1, self.size)
+        total = 0
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+
+class ScoreRankIndex:
+    """Counts leaderboard entries per score so rank queries are O(log n).
+
+    Scores (never negative) index directly into a Fenwick tree that doubles
+    as needed up to ``max_buckets``. The rare scores beyond that go into a
+    sorted overflow list so that a single absurd submission cannot blow up memory.
+    """
+
+    def __init__(self, max_buckets: int = 1 << 20) -> None:
+        self._max_buckets = max_buckets
+        self._counts: list[int] = []
+        self._tree = FenwickTree(0)
+        self._overflow: list[int] = []
+        self._best: dict[str, int] = {}
+        self._total = 0
+
+    def __len__(self) -> int:
+        return self._total
+
+    def best(self, username: str) -> Optional[int]:
+        return self._best.get(username)
+
+    def add(self, username: str, score: int) -> None:
+        if score < 0:
+            raise ValueError(f"Scores cannot be negative, got {score}")
+        if score >= self._max_buckets:
+            insort(self._overflow, score)
+        else:
+            if score >= len(self._counts):
+                self._grow(score + 1)
+            self._counts[score] += 1
+            self._tree.add(score, 1)
+        self._total += 1
+        if score > self._best.get(username, score - 1):
+            self._best[username] = score
+
+    def count_above(self, score: int) -> int:
+        """Number of entries with a strictly higher score."""
+        above = len(self._overflow) - bisect_right(self._overflow, score)
+        if score < self._max_buckets:
+            in_tree = self._total - len(self._overflow)
+            above += in_tree - self._tree.prefix_sum(score)
+        return above
+
+    def _grow(self, minimum: int) -> None:
+        size = max(len(self._counts), 1024)
+        while size < minimum:
+            size *= 2
+        size = min(size, self._max_buckets)
+        self._counts.extend([0] * (size - len(self._counts)))
+        self._tree = FenwickTree.from_counts(self._counts)
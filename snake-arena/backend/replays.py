@@ -0,0 +1,152 @@
+"""Recorded games: a compact binary encoding and batched re-simulation.
+
+A replay is the game's food seed, how many ticks it lasted, and its direction
+changes. Each change is ``(ticks since the previous change, direction)`` and
+is applied before the move of its tick; a delta of 0 stacks another change
+on the same tick. Ticks count from 1, so the first delta must be at least 1.
+On disk:
+
+    version   1 byte
+    seed      8 bytes, little-endian
+    ticks     4 bytes, little-endian
+    changes   one unsigned LEB128 varint each: ``delta << 2 | direction code``
+
+so a typical change costs one or two bytes.
+
+``verify_replays`` re-simulates many replays together in a ``GameBatch`` and
+is a plain top-level function so that it can run in a process pool.
+"""
+from __future__ import annotations
+
+import struct
+import time
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+from snake_engine import DIRECTION_CODES, DIRECTIONS, NO_TURN, GameBatch
+
+VERSION = 1
+HEADER = struct.Struct("<BQI")
+# An hour of play at 10 ticks per second. Pass-through snakes cannot hit a
+# wall, so without a cap one replay could keep a whole batch stepping.
+MAX_TICKS = 36_000
+
+
+class Replay(NamedTuple):
+    seed: int
+    ticks: int
+    turns: list[tuple[int, str]]
+
+
+class Verification(NamedTuple):
+    score: int
+    ticks: int
+    # Whether the snake lasted every recorded tick (it may die on the last one).
+    complete: bool
+
+
+def encode(seed: int, ticks: int, turns: Sequence[tuple[int, str]]) -> bytes:
+    out = bytearray(HEADER.pack(VERSION, seed, ticks))
+    tick = 0
+    for delta, direction in turns:
+        if delta < 0:
+            raise ValueError("Tick deltas must not be negative")
+        tick += delta
+        if tick == 0:
+            raise ValueError("Changes start at tick 1")
+        value = delta << 2 | DIRECTION_CODES[direction]
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_codes(data: bytes) -> tuple[int, int, list[tuple[int, int]]]:
+    """Decode to ``(seed, ticks, [(absolute tick, direction code), ...])``."""
+    if len(data) < HEADER.size:
+        raise ValueError("Replay is truncated")
+    version, seed, ticks = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError(f"Unsupported replay version {version}")
+    if ticks > MAX_TICKS:
+        raise ValueError(f"Replay is longer than {MAX_TICKS} ticks")
+    changes: list[tuple[int, int]] = []
+    tick = value = shift = 0
+    for byte in data[HEADER.size :]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        tick += value >> 2
+        if tick == 0:
+            raise ValueError("Changes start at tick 1")
+        changes.append((tick, value & 0b11))
+        value = shift = 0
+    if shift:
+        raise ValueError("Replay is truncated")
+    return seed, ticks, changes
+
+
+def decode(data: bytes) -> Replay:
+    seed, ticks, changes = decode_codes(data)
+    turns, previous = [], 0
+    for tick, code in changes:
+        turns.append((tick - previous, DIRECTIONS[code]))
+        previous = tick
+    return Replay(seed, ticks, turns)
+
+
+def verify_replays(games: Sequence[tuple[str, bytes]]) -> tuple[list[Verification], float]:
+    """Re-simulate ``(mode, replay)`` pairs together.
+
+    Each game runs until its snake dies or its recorded tick count is reached.
+    A replay that does not decode is not simulated and comes back incomplete.
+    Returns one ``Verification`` per game and the seconds spent simulating.
+    """
+    started = time.perf_counter()
+    decoded, valid = [], []
+    for _, data in games:
+        try:
+            decoded.append(decode_codes(data))
+            valid.append(True)
+        except ValueError:
+            decoded.append((0, 0, []))
+            valid.append(False)
+    batch = GameBatch(capacity=len(games))
+    slots = batch.add_many([mode for mode, _ in games], [seed for seed, _, _ in decoded])
+    last_tick = np.zeros(batch.capacity, dtype=np.int64)
+    last_tick[slots] = [ticks for _, ticks, _ in decoded]
+    batch.alive[slots[last_tick[slots] == 0]] = False
+
+    # Every change of every game, ordered by tick (stable, so stacked changes keep their order).
+    change_slots = np.array([slot for slot, (_, _, changes) in zip(slots, decoded) for _ in changes], dtype=np.int64)
+    change_ticks = np.array([tick for _, _, changes in decoded for tick, _ in changes], dtype=np.int64)
+    change_codes = np.array([code for _, _, changes in decoded for _, code in changes], dtype=np.int8)
+    order = np.argsort(change_ticks, kind="stable")
+    change_slots, change_ticks, change_codes = change_slots[order], change_ticks[order], change_codes[order]
+
+    turns = np.full(batch.capacity, NO_TURN, dtype=np.int8)
+    tick = 0
+    while batch.alive.any():
+        tick += 1
+        start, stop = np.searchsorted(change_ticks, [tick, tick + 1])
+        pending_slots, pending_codes = change_slots[start:stop], change_codes[start:stop]
+        while len(pending_slots):
+            # Apply the first pending change of each game, then the next, as recorded.
+            _, first = np.unique(pending_slots, return_index=True)
+            turns[:] = NO_TURN
+            turns[pending_slots[first]] = pending_codes[first]
+            batch.turn(turns)
+            keep = np.ones(len(pending_slots), dtype=bool)
+            keep[first] = False
+            pending_slots, pending_codes = pending_slots[keep], pending_codes[keep]
+        batch.tick()
+        batch.alive[last_tick == tick] = False
+
+    results = [
+        Verification(int(batch.score[slot]), int(batch.ticks[slot]), ok and int(batch.ticks[slot]) == ticks)
+        for slot, (_, ticks, _), ok in zip(slots, decoded, valid)
+    ]
+    return results, time.perf_counter() - started
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ScoreSubmission:
+    entry_id: str
+    user_id: str
+    username: str
+    score: int
+    mode: str
+    played_at: datetime
+    # Encoded replay (see replays.py) stored with the entry, if one was sent.
+    replay: Optional[bytes] = None
+
+
+# Writes a batch in one transaction and returns one error (or None) per submission.
+BatchWriter = Callable[[list[ScoreSubmission]], Awaitable[list[Optional[Exception]]]]
+
+
+class ScoreBatchQueue:
+    """Coalesces concurrent score submissions into batched writes.
+
+    Submissions wait in a bounded queue. A single background task takes up to
+    ``max_batch_size`` of them, waiting at most ``max_delay`` seconds for the
+    batch to fill, and hands them to ``write_batch``. ``submit`` returns only
+    once its submission has been committed, or raises the error it hit.
+    After ``close`` every unconfirmed submission fails with ``RuntimeError``
+    and new ones are refused.
+    """
+
+    def __init__(
+        self,
+        write_batch: BatchWriter,
+        max_batch_size: int,
+        max_delay: float,
+        queue_size: int,
+    ) -> None:
+        self.write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+        self.batches_written = 0
+        self.submissions_written = 0
+        self._queue: Optional[asyncio.Queue[tuple[ScoreSubmission, asyncio.Future[None]]]] = None
+        self._worker: Optional[asyncio.Task[None]] = None
+        self._in_flight: list[tuple[ScoreSubmission, asyncio.Future[None]]] = []
+        self._closed = False
+
+    async def submit(self, submission: ScoreSubmission) -> None:
+        if self._closed:
+            raise RuntimeError("Score queue is closed")
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        await self._queue.put((submission, future))
+        if self._closed and not future.done():
+            # Waited for room while close() drained the queue; nobody will write this.
+            future.set_exception(RuntimeError("Score queue is closed"))
+        await future
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
+        pending, self._in_flight = self._in_flight, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Score queue closed before the submission was confirmed"))
+
+    async def _next_batch(self) -> list[tuple[ScoreSubmission, asyncio.Future[None]]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = self._in_flight = await self._next_batch()
+            submissions = [submission for submission, _ in batch]
+            try:
+                errors = await self.write_batch(submissions)
+            except Exception as exc:
+                logger.exception("Failed to write score batch")
+                errors = [exc] * len(batch)
+            self.batches_written += 1
+            self.submissions_written += sum(error is None for error in errors)
+            for (_, future), error in zip(batch, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+            self._in_flight = []
@@ -0,0 +1,118 @@
+"""Line-oriented encoding of leaderboard entries for bulk export and import.
+
+Both formats carry the API's field names: ``id``, ``username``, ``score``,
+``mode`` and ``playedAt`` (ISO 8601). Everything here works on one chunk or
+one record at a time so that arbitrarily large dumps stream in flat memory.
+A CSV record spans several lines when a quoted field holds a line break;
+such breaks are read back as ``\n``.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, TypeVar
+
+FORMATS = ("ndjson", "csv")
+FIELDS = ("id", "username", "score", "mode", "playedAt")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+T = TypeVar("T")
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(FORMATS)}")
+
+
+def encode_header(fmt: str) -> str:
+    return ",".join(FIELDS) + "\r\n" if fmt == "csv" else ""
+
+
+def encode_rows(rows: Iterable[dict[str, Any]], fmt: str) -> str:
+    """Encode entries shaped like the API's leaderboard entries."""
+    if fmt == "ndjson":
+        return "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([row[field] for field in FIELDS] for row in rows)
+    return buffer.getvalue()
+
+
+def parse_record(line: str, fmt: str, modes: set[str], line_number: int) -> dict[str, Any]:
+    """Parse one record into a ``leaderboard_entries`` row, or raise ``ValueError``."""
+    try:
+        if fmt == "ndjson":
+            record = json.loads(line)
+            values = [record[field] for field in FIELDS]
+            # JSON has its own numbers: anything but an integer (1.9, "19", true) is a mistake.
+            if type(values[2]) is not int:
+                raise ValueError(f"score must be an integer, got {values[2]!r}")
+        else:
+            values = next(csv.reader(io.StringIO(line)))
+            if len(values) != len(FIELDS):
+                raise ValueError(f"expected {len(FIELDS)} columns, got {len(values)}")
+        entry_id, username, score, mode, played_at = values
+        if mode not in modes:
+            raise ValueError(f"unknown mode {mode!r}")
+        score = int(score)
+        if score < 0:
+            raise ValueError(f"negative score {score}")
+        played = datetime.fromisoformat(played_at)
+        return {
+            "id": str(entry_id),
+            "username": str(username),
+            "score": score,
+            "mode": mode,
+            "played_at": played if played.tzinfo else played.replace(tzinfo=timezone.utc),
+        }
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Line {line_number}: {exc}") from exc
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines, without line endings."""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r").decode("utf-8")
+    if pending.strip():
+        yield pending.rstrip(b"\r").decode("utf-8")
+
+
+async def read_records(lines: AsyncIterable[str], fmt: str, modes: set[str]) -> AsyncIterator[dict[str, Any]]:
+    line_number = start = 0
+    pending: list[str] = []
+    async for line in lines:
+        line_number += 1
+        if fmt == "csv":
+            pending.append(line)
+            # An odd number of quotes so far leaves a quoted field open across the line break.
+            if sum(part.count('"') for part in pending) % 2:
+                start = start or line_number
+                continue
+            line, pending = "\n".join(pending), []
+            first, start = start or line_number, 0
+        else:
+            first = line_number
+        if not line.strip():
+            continue
+        if fmt == "csv" and first == 1 and line.strip() == ",".join(FIELDS):
+            continue
+        yield parse_record(line, fmt, modes, first)
+    if pending:
+        raise ValueError(f"Line {start}: unterminated quoted field")
+
+
+async def chunked(items: AsyncIterable[T], size: int) -> AsyncIterator[list[T]]:
+    chunk: list[T] = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
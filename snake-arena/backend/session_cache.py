@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: str
+    username: str
+    email: str
+    high_score: int
+    created_at: datetime
+
+
+class SessionCache:
+    """LRU map of session token to user, with a time-to-live per entry.
+
+    Entries are dropped explicitly on logout and whenever the user's cached
+    fields change, so the TTL only bounds how long a session deleted behind
+    our back (or by another worker) can keep resolving.
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+        self._tokens_by_user: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[CachedUser]:
+        with self._lock:
+            item = self._entries.get(token)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, user = item
+            if expires_at <= self._clock():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: CachedUser, ttl: Optional[float] = None) -> None:
+        """Cache ``user`` for ``token``, for at most ``ttl`` seconds when given (e.g. until the session expires)."""
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (self._clock() + ttl, user)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._remove(token)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hitRate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, token: str) -> None:
+        item = self._entries.pop(token, None)
+        if item is None:
+            return
+        tokens = self._tokens_by_user.get(item[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[item[1].id]
@@ -0,0 +1,192 @@
+"""Many snake games advanced together, one NumPy step per tick.
+
+``GameBatch`` follows the same rules as ``live_games.LiveGame`` but keeps every
+game in a slot of shared arrays:
+
+    body      (games, cells)  ring buffer of packed cells; ``head`` points at the head
+    occupied  (games, cells)  whether each cell holds part of the snake
+    head, length, direction, food, score, alive, wraps   one value per game
+
+A tick moves every live snake at once: new heads, wall and self collisions,
+and food checks are array operations over all games, and only the games that
+ate in that tick get new food.
+
+Food placement depends only on a game's seed and on how much food it has
+eaten, never on which other games share the batch, so a game can be replayed
+from its seed and moves.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+from live_games import FOOD_SCORE, GRID_SIZE, INITIAL_SNAKE, MOVES, OPPOSITES, pack, unpack
+
+CELLS = GRID_SIZE * GRID_SIZE
+START = np.array([pack(x, y) for x, y in INITIAL_SNAKE], dtype=np.int16)
+DIRECTIONS = ("UP", "DOWN", "LEFT", "RIGHT")
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+NO_TURN = -1
+
+DX = np.array([MOVES[direction][0] for direction in DIRECTIONS], dtype=np.int16)
+DY = np.array([MOVES[direction][1] for direction in DIRECTIONS], dtype=np.int16)
+OPPOSITE = np.array([DIRECTION_CODES[OPPOSITES[direction]] for direction in DIRECTIONS], dtype=np.int8)
+
+
+def mix(seeds: np.ndarray, counters: np.ndarray) -> np.ndarray:
+    """SplitMix64 of ``seed`` and ``counter``, element-wise (uint64 wraps around)."""
+    z = seeds + (counters.astype(np.uint64) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class GameBatch:
+    """Fixed-rules snake games stored as arrays; slots are reused once removed."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.capacity = 0
+        self.body = np.zeros((0, CELLS), dtype=np.int16)
+        self.occupied = np.zeros((0, CELLS), dtype=bool)
+        self.head = np.zeros(0, dtype=np.int32)
+        self.length = np.zeros(0, dtype=np.int32)
+        self.direction = np.zeros(0, dtype=np.int8)
+        self.food = np.zeros(0, dtype=np.int16)
+        self.score = np.zeros(0, dtype=np.int32)
+        self.ticks = np.zeros(0, dtype=np.int32)
+        self.eaten = np.zeros(0, dtype=np.int32)
+        self.seed = np.zeros(0, dtype=np.uint64)
+        self.wraps = np.zeros(0, dtype=bool)
+        self.alive = np.zeros(0, dtype=bool)
+        self.in_use = np.zeros(0, dtype=bool)
+        self._free: list[int] = []
+        self._grow(capacity)
+
+    def __len__(self) -> int:
+        return int(self.in_use.sum())
+
+    def add(self, mode: str, seed: int) -> int:
+        """Start a game in a free slot and return the slot."""
+        return int(self.add_many([mode], [seed])[0])
+
+    def add_many(self, modes: Sequence[str], seeds: Sequence[int]) -> np.ndarray:
+        """Start one game per mode and seed, returning their slots."""
+        count = len(modes)
+        if count > len(self._free):
+            self._grow(max(self.capacity * 2, self.capacity + count - len(self._free)))
+        slots = np.array([self._free.pop() for _ in range(count)], dtype=np.int64)
+        self.body[slots] = 0
+        self.body[slots, : len(START)] = START[::-1]
+        self.head[slots] = len(START) - 1
+        self.length[slots] = len(START)
+        self.occupied[slots] = False
+        self.occupied[slots[:, None], START] = True
+        self.direction[slots] = DIRECTION_CODES["RIGHT"]
+        self.score[slots] = 0
+        self.ticks[slots] = 0
+        self.eaten[slots] = 0
+        self.seed[slots] = np.array([seed & 0xFFFFFFFFFFFFFFFF for seed in seeds], dtype=np.uint64)
+        self.wraps[slots] = np.array([mode == "pass-through" for mode in modes], dtype=bool)
+        self.alive[slots] = True
+        self.in_use[slots] = True
+        self._spawn_food(slots)
+        return slots
+
+    def remove(self, slots: int | np.ndarray) -> None:
+        slots = np.atleast_1d(slots)
+        slots = slots[self.in_use[slots]]
+        self.in_use[slots] = False
+        self.alive[slots] = False
+        self._free.extend(slots.tolist())
+
+    def turn(self, turns: np.ndarray) -> None:
+        """Apply one direction code per slot (``NO_TURN`` to keep going); reversing is ignored."""
+        allowed = (turns != NO_TURN) & (turns != OPPOSITE[self.direction])
+        self.direction[allowed] = turns[allowed]
+
+    def tick(self, turns: Optional[np.ndarray] = None) -> np.ndarray:
+        """Advance every live game by one move and return the slots that died."""
+        if turns is not None:
+            self.turn(turns)
+        games = np.flatnonzero(self.alive)
+        if not len(games):
+            return games
+        self.ticks[games] += 1
+
+        y, x = np.divmod(self.body[games, self.head[games]], GRID_SIZE)
+        direction = self.direction[games]
+        x = x + DX[direction]
+        y = y + DY[direction]
+        wraps = self.wraps[games]
+        x = np.where(wraps, x % GRID_SIZE, x)
+        y = np.where(wraps, y % GRID_SIZE, y)
+        outside = (x < 0) | (x >= GRID_SIZE) | (y < 0) | (y >= GRID_SIZE)
+        new_head = np.where(outside, 0, y * GRID_SIZE + x).astype(np.int16)
+
+        tail_index = (self.head[games] - self.length[games] + 1) % CELLS
+        tail = self.body[games, tail_index]
+        # Moving into the cell the tail is leaving is allowed.
+        bitten = self.occupied[games, new_head] & (new_head != tail)
+        died = outside | bitten
+        dead = games[died]
+        self.alive[dead] = False
+
+        moving = ~died
+        games, new_head, tail = games[moving], new_head[moving], tail[moving]
+        ate = new_head == self.food[games]
+        self.occupied[games[~ate], tail[~ate]] = False
+        self.length[games[ate]] += 1
+        self.head[games] = (self.head[games] + 1) % CELLS
+        self.body[games, self.head[games]] = new_head
+        self.occupied[games, new_head] = True
+
+        eaters = games[ate]
+        if len(eaters):
+            self.score[eaters] += FOOD_SCORE
+            self.eaten[eaters] += 1
+            self._spawn_food(eaters)
+        return dead
+
+    def cells(self, slot: int) -> list[int]:
+        """The snake's packed cells, head first."""
+        positions = (self.head[slot] - np.arange(self.length[slot])) % CELLS
+        return self.body[slot, positions].tolist()
+
+    def state(self, slot: int) -> dict:
+        """The game in the shape of a live player (``Position`` dicts for cells)."""
+        return {
+            "score": int(self.score[slot]),
+            "snake": [unpack(cell) for cell in self.cells(slot)],
+            "food": unpack(int(self.food[slot])),
+            "direction": DIRECTIONS[self.direction[slot]],
+            "isPlaying": bool(self.alive[slot]),
+        }
+
+    def _spawn_food(self, games: np.ndarray) -> None:
+        """Put food on a free cell chosen from the game's seed and food count."""
+        free = ~self.occupied[games]
+        free_count = free.sum(axis=1)
+        draw = mix(self.seed[games], self.eaten[games]) % np.maximum(free_count, 1).astype(np.uint64)
+        # Index of the (draw + 1)-th free cell in each row.
+        cell = np.argmax(np.cumsum(free, axis=1) > draw[:, None].astype(np.int64), axis=1)
+        full = free_count == 0
+        cell[full] = self.body[games[full], self.head[games[full]]]
+        self.food[games] = cell
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        for name in ("body", "occupied"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros((extra, CELLS), dtype=array.dtype)]))
+        for name in ("head", "length", "direction", "food", "score", "ticks", "eaten", "seed", "wraps", "alive", "in_use"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(extra, dtype=array.dtype)]))
+        self._free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+
+def direction_codes(directions: Iterable[Optional[str]]) -> np.ndarray:
+    return np.array([NO_TURN if direction is None else DIRECTION_CODES[direction] for direction in directions], dtype=np.int8)
@@ -0,0 +1,148 @@
+"""Serve the frontend build with precompressed variants and long-lived caching.
+
+``precompress`` writes ``.br`` and ``.gz`` siblings next to each text asset,
+either at image build time (``python static_assets.py <dist>``) or on startup.
+``PrecompressedStaticFiles`` then picks the best variant the client accepts
+and sends it as a plain ``FileResponse``, which servers implementing the ASGI
+``http.response.pathsend`` extension hand to ``sendfile``.
+"""
+from __future__ import annotations
+
+import gzip
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterator
+
+import brotli
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Scope
+
+COMPRESSIBLE_SUFFIXES = {".css", ".html", ".js", ".json", ".map", ".mjs", ".svg", ".txt", ".webmanifest", ".xml"}
+MIN_COMPRESS_SIZE = 1024
+# Best first: brotli beats gzip on text assets.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Vite writes content-hashed names such as assets/index-BQ3Hf5xY.js.
+FINGERPRINTED = re.compile(r"(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.\w+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def iter_compressible(directory: Path) -> Iterator[Path]:
+    for path in directory.rglob("*"):
+        if path.suffix in COMPRESSIBLE_SUFFIXES and path.is_file() and path.stat().st_size >= MIN_COMPRESS_SIZE:
+            yield path
+
+
+def precompress(directory: str | os.PathLike[str]) -> int:
+    """Write missing or outdated ``.br``/``.gz`` variants and return how many were written.
+
+    A variant that would not be smaller than its source is not kept.
+    """
+    written = 0
+    for path in iter_compressible(Path(directory)):
+        source_mtime = path.stat().st_mtime
+        data = None
+        for encoding, suffix in ENCODINGS:
+            target = path.with_name(path.name + suffix)
+            if target.exists() and target.stat().st_mtime >= source_mtime:
+                continue
+            data = data if data is not None else path.read_bytes()
+            compressed = compress(data, encoding)
+            if len(compressed) >= len(data):
+                target.unlink(missing_ok=True)
+                continue
+            target.write_bytes(compressed)
+            written += 1
+    return written
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Content codings in an ``Accept-Encoding`` header, minus those refused with ``q=0``."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that negotiates precompressed variants and sets ``Cache-Control``.
+
+    Fingerprinted assets are marked immutable; everything else, notably
+    ``index.html``, must be revalidated so that a new deploy is picked up.
+    """
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = os.fspath(full_path)
+        headers = {"Cache-Control": self.cache_control(path)}
+        response = None
+        if Path(path).suffix in COMPRESSIBLE_SUFFIXES:
+            headers["Vary"] = "Accept-Encoding"
+            response = self.encoded_response(path, request_headers.get("accept-encoding", ""), headers, status_code)
+        if response is None:
+            response = FileResponse(path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def encoded_response(
+        self,
+        path: str,
+        accept_encoding: str,
+        headers: dict[str, str],
+        status_code: int,
+    ) -> FileResponse | None:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(path + suffix)
+            except FileNotFoundError:
+                continue
+            # The variant's own stat yields an ETag distinct from the identity encoding's.
+            return FileResponse(
+                path + suffix,
+                status_code=status_code,
+                stat_result=variant_stat,
+                headers={**headers, "Content-Encoding": encoding},
+                media_type=mimetypes.guess_type(path)[0] or "text/plain",
+            )
+        return None
+
+    def cache_control(self, path: str) -> str:
+        relative = os.path.relpath(path, os.path.realpath(self.directory)) if self.directory else path
+        return IMMUTABLE_CACHE_CONTROL if FINGERPRINTED.search(Path(relative).as_posix()) else REVALIDATE_CACHE_CONTROL
+
+
+if __name__ == "__main__":
+    for directory in sys.argv[1:] or ["frontend_dist"]:
+        print(f"{directory}: wrote {precompress(directory)} compressed variants")
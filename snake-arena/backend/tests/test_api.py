@@ -99,6 +99,9 @@ def test_submit_score_success(client):
     assert body["data"]["username"] == "SnakeMaster"
     assert body["data"]["score"] == 1337
 
+    negative = client.post("/api/scores", json={"score": -5, "mode": "walls"})
+    assert negative.status_code == 422
+
 
 def test_live_players(client):
     response = client.get("/api/live-players")
@@ -114,3 +117,952 @@ def test_live_player_not_found(client):
     body = response.json()
     assert body["success"] is True
     assert body["data"] is None
+
+
+def test_leaderboard_sorted_by_score(client):
+    response = client.get("/api/leaderboard")
+    assert response.status_code == 200
+    scores = [entry["score"] for entry in response.json()["data"]]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_leaderboard_keyset_pagination(client):
+    full = client.get("/api/leaderboard", params={"mode": "walls"}).json()["data"]
+
+    pages = []
+    params = {"mode": "walls", "limit": 3}
+    while True:
+        body = client.get("/api/leaderboard", params=params).json()
+        assert body["success"] is True
+        assert len(body["data"]) <= 3
+        pages.extend(body["data"])
+        if not body["nextCursor"]:
+            break
+        params["after"] = body["nextCursor"]
+
+    assert [entry["id"] for entry in pages] == [entry["id"] for entry in full]
+
+
+def test_leaderboard_invalid_cursor(client):
+    response = client.get("/api/leaderboard", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+    body = response.json()
+    assert body["success"] is False
+
+
+def test_submitted_score_is_ranked_in_cached_leaderboard(client):
+    client.post(
+        "/api/auth/login",
+        json={"email": "player2@test.com", "password": "password123"},
+    )
+    submit = client.post("/api/scores", json={"score": 900, "mode": "walls"}).json()["data"]
+
+    entries = client.get("/api/leaderboard", params={"mode": "walls"}).json()["data"]
+    scores = [entry["score"] for entry in entries]
+    assert scores == sorted(scores, reverse=True)
+    assert entries[1]["id"] == submit["id"]
+
+
+def test_leaderboard_cache_sees_writes_from_other_workers(client):
+    import main
+
+    main.leaderboard_cache.backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+    client.portal.call(main.refresh_leaderboard_cache, main.leaderboard_cache.modes)
+
+    # Simulate another worker committing a score and bumping the shared version.
+    other_id = main.IdGenerator(worker_id=7).next_id()
+    with main.SessionLocal() as db:
+        db.add(
+            main.LeaderboardEntryModel(
+                id=other_id,
+                username="Elsewhere",
+                score=5000,
+                mode="walls",
+                played_at=main.datetime.now(main.timezone.utc),
+            )
+        )
+        db.commit()
+    other_backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+    client.portal.call(other_backend.bump, "walls")
+
+    entries = client.get("/api/leaderboard", params={"mode": "walls"}).json()["data"]
+    assert entries[0]["id"] == other_id
+
+
+def test_stale_leaderboard_catches_up_once_with_only_new_rows(client, monkeypatch):
+    import main
+
+    main.leaderboard_cache.backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+    client.portal.call(main.refresh_leaderboard_cache, main.leaderboard_cache.modes)
+    with main.SessionLocal() as db:
+        db.add(
+            main.LeaderboardEntryModel(
+                id=main.IdGenerator(worker_id=7).next_id(),
+                username="Elsewhere",
+                score=5000,
+                mode="walls",
+                played_at=main.datetime.now(main.timezone.utc),
+            )
+        )
+        db.commit()
+    other_backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+    client.portal.call(other_backend.bump, "walls")
+
+    syncs, caught_up = [], []
+    sync = main.sync_leaderboard_mode
+    catch_up = main.leaderboard_cache.catch_up
+
+    async def counting_sync(mode):
+        syncs.append(mode)
+        await main.asyncio.sleep(0.05)
+        await sync(mode)
+
+    def recording_catch_up(mode, version, rows, synced_at):
+        caught_up.append(len(rows))
+        return catch_up(mode, version, rows, synced_at)
+
+    monkeypatch.setattr(main, "sync_leaderboard_mode", counting_sync)
+    monkeypatch.setattr(main.leaderboard_cache, "catch_up", recording_catch_up)
+
+    async def read_concurrently():
+        await main.asyncio.gather(*(main.ensure_leaderboard_cache_fresh(["walls"]) for _ in range(5)))
+
+    client.portal.call(read_concurrently)
+    assert syncs == ["walls"]
+    assert caught_up == [1]
+    assert client.get("/api/leaderboard/rank", params={"username": "Elsewhere"}).json()["data"]["rank"] == 1
+
+
+def test_first_version_bumps_from_two_workers_both_count(client):
+    import main
+
+    workers = [main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0) for _ in range(2)]
+
+    async def bump_together():
+        return await main.asyncio.gather(*(worker.bump("pass-through") for worker in workers))
+
+    assert sorted(client.portal.call(bump_together)) == [1, 2]
+    assert client.portal.call(workers[0].version, "pass-through") == 2
+
+
+def test_player_rank_lookup(client):
+    response = client.get("/api/leaderboard/rank", params={"username": "PyThonX", "mode": "walls"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["success"] is True
+    assert body["data"]["rank"] == 2
+    assert body["data"]["score"] == 875
+
+    overall = client.get("/api/leaderboard/rank", params={"username": "PyThonX"}).json()["data"]
+    assert overall["rank"] == 3
+
+    missing = client.get("/api/leaderboard/rank", params={"username": "Nobody"}).json()
+    assert missing["success"] is True
+    assert missing["data"] is None
+
+
+def test_me_includes_rank_after_submit(client):
+    client.post(
+        "/api/auth/signup",
+        json={"email": "ranked@test.com", "username": "Ranked", "password": "pass"},
+    )
+    assert client.get("/api/auth/me").json()["data"]["rank"] is None
+
+    client.post("/api/scores", json={"score": 1000, "mode": "pass-through"})
+    assert client.get("/api/auth/me").json()["data"]["rank"] == 2
+
+    rank = client.get("/api/leaderboard/rank", params={"username": "Ranked", "mode": "pass-through"}).json()
+    assert rank["data"]["rank"] == 1
+
+
+def test_me_rank_without_cache_skips_counting_every_entry(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "LEADERBOARD_CACHE_ENABLED", False)
+    client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    main.event.listen(main.async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        me = client.get("/api/auth/me").json()["data"]
+    finally:
+        main.event.remove(main.async_engine.sync_engine, "before_cursor_execute", record)
+    assert me["rank"] == 1
+    counts = [statement for statement in statements if "count(*)" in statement]
+    assert counts and all("WHERE" in statement for statement in counts)
+    assert client.get("/api/leaderboard/rank", params={"username": "SnakeMaster"}).json()["data"]["totalEntries"] == 12
+
+
+def test_live_players_stream_sends_snapshot_then_deltas(client):
+    import main
+
+    main.live_broadcaster.poll_interval = 0.01
+    with client.websocket_connect("/api/live-players/stream") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        players = {player["id"]: player for player in snapshot["data"]}
+        assert players["live1"]["snake"] == [{"x": 5, "y": 5}, {"x": 4, "y": 5}, {"x": 3, "y": 5}]
+
+        with main.SessionLocal() as db:
+            player = db.get(main.LivePlayerModel, "live1")
+            player.snake = [{"x": 6, "y": 5}, {"x": 5, "y": 5}, {"x": 4, "y": 5}]
+            player.food = {"x": 1, "y": 1}
+            db.commit()
+
+        delta = websocket.receive_json()
+        assert delta == {
+            "type": "delta",
+            "events": [
+                {"op": "head", "id": "live1", "positions": [{"x": 6, "y": 5}]},
+                {"op": "tail", "id": "live1", "count": 1},
+                {"op": "food", "id": "live1", "position": {"x": 1, "y": 1}},
+            ],
+        }
+
+
+def test_live_broadcaster_loads_once_for_concurrent_subscribers():
+    import asyncio
+
+    from live_stream import LivePlayerBroadcaster
+
+    loads = []
+
+    async def load_players():
+        loads.append(None)
+        await asyncio.sleep(0.01)
+        return {"p1": {"id": "p1"}}
+
+    async def failing_load():
+        raise RuntimeError("database unavailable")
+
+    async def subscribe_twice():
+        broadcaster = LivePlayerBroadcaster(load_players, poll_interval=60, queue_size=4)
+        queues = await asyncio.gather(broadcaster.subscribe(), broadcaster.subscribe())
+        snapshots = [queue.get_nowait() for queue in queues]
+        for queue in queues:
+            broadcaster.unsubscribe(queue)
+        return snapshots
+
+    async def subscribe_failing():
+        broadcaster = LivePlayerBroadcaster(failing_load, poll_interval=60, queue_size=4)
+        with pytest.raises(RuntimeError):
+            await broadcaster.subscribe()
+        return broadcaster._poller, broadcaster.subscriber_count
+
+    snapshots = asyncio.run(subscribe_twice())
+    assert len(loads) == 1
+    assert snapshots == ['{"type":"snapshot","data":[{"id":"p1"}]}'] * 2
+    assert asyncio.run(subscribe_failing()) == (None, 0)
+
+
+def test_live_game_is_held_in_memory_until_it_ends(client):
+    import main
+
+    client.post(
+        "/api/auth/login",
+        json={"email": "player1@test.com", "password": "password123"},
+    )
+    start = client.post("/api/live-players", json={"mode": "pass-through"})
+    assert start.status_code == 200
+    game = start.json()["data"]
+    assert game["snake"] == [{"x": 10, "y": 10}, {"x": 9, "y": 10}, {"x": 8, "y": 10}]
+
+    tick = client.post(f"/api/live-players/{game['id']}/tick", json={"direction": "DOWN", "steps": 2})
+    assert tick.status_code == 200
+    assert tick.json()["data"]["snake"][0] == {"x": 10, "y": 12}
+
+    detail = client.get(f"/api/live-players/{game['id']}").json()["data"]
+    assert detail["snake"][0] == {"x": 10, "y": 12}
+    with main.SessionLocal() as db:
+        assert db.get(main.LivePlayerModel, game["id"]) is None
+
+    session = client.cookies.get("session")
+    client.cookies.clear()
+    forbidden = client.post(f"/api/live-players/{game['id']}/tick", json={})
+    assert forbidden.status_code == 403
+
+    client.cookies.set("session", session)
+    client.portal.call(main.live_games.flush)
+    with main.SessionLocal() as db:
+        assert db.get(main.LivePlayerModel, game["id"]).snake[0] == {"x": 10, "y": 12}
+
+    end = client.post(f"/api/live-players/{game['id']}/end")
+    assert end.status_code == 200
+    assert end.json()["data"]["isPlaying"] is False
+    with main.SessionLocal() as db:
+        assert db.get(main.LivePlayerModel, game["id"]) is None
+    assert game["id"] not in {player["id"] for player in client.get("/api/live-players").json()["data"]}
+
+
+def test_idle_live_games_and_stale_snapshots_are_swept(client, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    import main
+
+    client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    idle = client.post("/api/live-players", json={"mode": "walls"}).json()["data"]
+    client.portal.call(main.live_games.flush)
+    now = datetime.now(timezone.utc)
+    snapshot = {"username": "Ghost", "score": 0, "mode": "walls", "snake": [], "food": {"x": 2, "y": 2}, "direction": "UP"}
+    with main.SessionLocal() as db:
+        # Left behind by a worker that stopped, and by an earlier version that kept finished games.
+        db.add(main.LivePlayerModel(id="orphan", is_playing=True, updated_at=now - timedelta(hours=1), **snapshot))
+        db.add(main.LivePlayerModel(id="finished", is_playing=False, updated_at=now, **snapshot))
+        db.commit()
+    listed = {player["id"] for player in client.get("/api/live-players").json()["data"]}
+    assert "finished" not in listed
+    assert {"orphan", idle["id"]} <= listed
+
+    assert client.portal.call(main.sweep_idle_live_games) == {"evicted": 0, "deleted": 2}
+    monkeypatch.setattr(main, "LIVE_GAME_IDLE_TIMEOUT", 0)
+    assert client.portal.call(main.sweep_idle_live_games)["evicted"] == 1
+    assert main.live_games.get(idle["id"]) is None
+    assert client.post(f"/api/live-players/{idle['id']}/tick", json={}).status_code == 404
+    with main.SessionLocal() as db:
+        # The seeded demo players carry no updated_at and stay.
+        assert sorted(player.id for player in db.query(main.LivePlayerModel)) == [f"live{n}" for n in range(1, 6)]
+
+
+def test_batched_score_ingestion_confirms_after_commit(client):
+    import main
+
+    main.SCORE_INGEST_MODE = "batched"
+    client.post(
+        "/api/auth/login",
+        json={"email": "player5@test.com", "password": "password123"},
+    )
+    response = client.post("/api/scores", json={"score": 2000, "mode": "walls"})
+    assert response.status_code == 200
+    assert response.json()["data"]["score"] == 2000
+    assert main.score_queue.submissions_written == 1
+
+    with main.SessionLocal() as db:
+        assert db.get(main.LeaderboardEntryModel, response.json()["data"]["id"]) is not None
+        user = db.execute(main.select(main.UserModel).where(main.UserModel.id == "5")).scalar_one()
+        assert user.high_score == 2000
+
+
+def test_score_batch_isolates_rejected_rows(client):
+    import main
+
+    now = main.datetime.now(main.timezone.utc)
+    submissions = [
+        main.ScoreSubmission("batch-1", "3", "CobraKai", 900, "walls", now),
+        main.ScoreSubmission("1", "3", "CobraKai", 950, "walls", now),
+        main.ScoreSubmission("batch-2", "3", "CobraKai", 1000, "walls", now),
+    ]
+    errors = client.portal.call(main.write_score_batch, submissions)
+    assert errors[0] is None and errors[2] is None
+    assert isinstance(errors[1], main.IntegrityError)
+
+    with main.SessionLocal() as db:
+        user = db.get(main.UserModel, "3")
+        assert user.high_score == 1000
+
+
+def test_score_queue_close_fails_pending_submissions():
+    import asyncio
+    from datetime import datetime, timezone
+
+    from score_ingest import ScoreBatchQueue, ScoreSubmission
+
+    async def stalled_writer(submissions):
+        await asyncio.sleep(60)
+
+    async def scenario():
+        queue = ScoreBatchQueue(stalled_writer, max_batch_size=1, max_delay=0, queue_size=10)
+        now = datetime.now(timezone.utc)
+        submits = [
+            asyncio.create_task(queue.submit(ScoreSubmission(f"e{n}", "1", "SnakeMaster", n, "walls", now)))
+            for n in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        await queue.close()
+        results = await asyncio.wait_for(asyncio.gather(*submits, return_exceptions=True), 1)
+        with pytest.raises(RuntimeError, match="closed"):
+            await queue.submit(ScoreSubmission("late", "1", "SnakeMaster", 1, "walls", now))
+        return results
+
+    results = asyncio.run(scenario())
+    # One submission was mid-write and two were still queued; all of them fail.
+    assert [type(result) for result in results] == [RuntimeError] * 3
+
+
+def test_session_cache_serves_repeat_lookups_and_logout_invalidates(client):
+    client.post(
+        "/api/auth/login",
+        json={"email": "player1@test.com", "password": "password123"},
+    )
+    assert client.get("/api/auth/me").json()["data"]["username"] == "SnakeMaster"
+    assert client.get("/api/auth/me").json()["data"]["username"] == "SnakeMaster"
+
+    stats = client.get("/api/metrics").json()["data"]["sessionCache"]
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
+
+    client.post("/api/scores", json={"score": 5000, "mode": "walls"})
+    assert client.get("/api/auth/me").json()["data"]["highScore"] == 5000
+
+    session = client.cookies.get("session")
+    client.post("/api/auth/logout")
+    client.cookies.set("session", session)
+    assert client.get("/api/auth/me").json()["data"] is None
+
+
+def test_sqlite_connections_apply_tuning_pragmas(client):
+    import main
+
+    with main.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == main.ENGINE_SETTINGS.sqlite_busy_timeout_ms
+
+    database = client.get("/api/metrics").json()["data"]["database"]
+    assert database["pragmas"]["journal_mode"] == "WAL"
+    assert database["pool"]["pool_size"] == main.ENGINE_SETTINGS.pool_size
+
+
+def test_fast_path_responses_match_the_response_models(client):
+    import main
+
+    for cache_enabled in (True, False):
+        main.LEADERBOARD_CACHE_ENABLED = cache_enabled
+        body = client.get("/api/leaderboard", params={"limit": 3}).json()
+        parsed = main.ApiResponseLeaderboardList.model_validate(body)
+        assert parsed.model_dump(by_alias=True, mode="json") == body
+        assert body["data"][0]["playedAt"].endswith("Z")
+
+    body = client.get("/api/live-players").json()
+    parsed = main.ApiResponseLivePlayerList.model_validate(body)
+    assert parsed.model_dump(by_alias=True, mode="json") == body
+    player = client.get(f"/api/live-players/{body['data'][0]['id']}").json()
+    assert player["data"] == body["data"][0]
+    assert client.get("/api/live-players/missing").json() == {"success": True, "data": None, "error": None}
+
+
+def test_leaderboard_conditional_get_until_a_score_is_submitted(client, monkeypatch):
+    import main
+
+    main.LEADERBOARD_CACHE_ENABLED = False
+    first = client.get("/api/leaderboard", params={"mode": "walls"})
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "AsyncSessionLocal", None)  # a 304 must not need the database
+        cached = client.get("/api/leaderboard", params={"mode": "walls"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert client.get("/api/leaderboard", params={"mode": "walls", "limit": 1}).headers["etag"] != etag
+
+    client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    client.post("/api/scores", json={"score": 3000, "mode": "walls"})
+    refreshed = client.get("/api/leaderboard", params={"mode": "walls"}, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+    assert refreshed.json()["data"][0]["score"] == 3000
+
+
+def test_live_player_conditional_get_tracks_game_version(client):
+    client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    game_id = client.post("/api/live-players", json={"mode": "walls"}).json()["data"]["id"]
+
+    etag = client.get(f"/api/live-players/{game_id}").headers["etag"]
+    assert client.get(f"/api/live-players/{game_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"/api/live-players/{game_id}/tick", json={})
+    moved = client.get(f"/api/live-players/{game_id}", headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["etag"] != etag
+
+
+def test_startup_logs_database_settings_and_precompression(tmp_path, monkeypatch, caplog):
+    import logging
+
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / "index.html").write_text("<html>" + "<p>arena</p>" * 200 + "</html>")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("FRONTEND_DIST", str(tmp_path / "dist"))
+    sys.modules.pop("main", None)
+    import main
+
+    caplog.set_level(logging.INFO, logger="uvicorn.error")
+    with TestClient(main.app):
+        pass
+    messages = [record.getMessage() for record in caplog.records if record.name == "uvicorn.error.main"]
+    assert any(message.startswith("Database engine:") and "'journal_mode': 'WAL'" in message for message in messages)
+    assert any(message.startswith("Precompressed 2 frontend asset variants") for message in messages)
+
+
+def test_static_assets_are_precompressed_and_negotiated(tmp_path):
+    from starlette.applications import Starlette
+
+    from static_assets import PrecompressedStaticFiles, precompress
+
+    bundle = "console.log('snake');\n" * 200
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "index-BQ3Hf5xY.js").write_text(bundle)
+    (tmp_path / "index.html").write_text("<html>" + "<p>arena</p>" * 200 + "</html>")
+    assert precompress(tmp_path) == 4
+    assert precompress(tmp_path) == 0
+
+    static = Starlette()
+    static.mount("/", PrecompressedStaticFiles(directory=tmp_path, html=True))
+    with TestClient(static) as static_client:
+        brotli = static_client.get("/assets/index-BQ3Hf5xY.js", headers={"Accept-Encoding": "gzip, br"})
+        assert brotli.headers["content-encoding"] == "br"
+        assert brotli.headers["content-type"].startswith("text/javascript")
+        assert brotli.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert brotli.text == bundle
+
+        gzipped = static_client.get("/assets/index-BQ3Hf5xY.js", headers={"Accept-Encoding": "gzip, br;q=0"})
+        assert gzipped.headers["content-encoding"] == "gzip"
+        assert gzipped.headers["etag"] != brotli.headers["etag"]
+        revalidated = static_client.get(
+            "/assets/index-BQ3Hf5xY.js",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]},
+        )
+        assert revalidated.status_code == 304
+
+        plain = static_client.get("/", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.headers["cache-control"] == "no-cache"
+        assert plain.headers["vary"] == "Accept-Encoding"
+
+
+def test_user_stats_follow_submissions_and_backfill(client):
+    import main
+
+    seeded = client.get("/api/users/1/stats").json()["data"]
+    assert seeded == [
+        {
+            "mode": "walls",
+            "bestScore": 1250,
+            "gamesPlayed": 1,
+            "averageScore": 1250.0,
+            "lastPlayedAt": "2024-12-05T00:00:00Z",
+        }
+    ]
+
+    client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    client.post("/api/scores", json={"score": 750, "mode": "walls"})
+    main.SCORE_INGEST_MODE = "batched"
+    client.post("/api/scores", json={"score": 300, "mode": "pass-through"})
+
+    stats = {row["mode"]: row for row in client.get("/api/users/1/stats").json()["data"]}
+    assert stats["walls"]["bestScore"] == 1250
+    assert stats["walls"]["gamesPlayed"] == 2
+    assert stats["walls"]["averageScore"] == 1000.0
+    assert stats["pass-through"]["gamesPlayed"] == 1
+
+    with main.SessionLocal() as db:
+        assert main.backfill_user_stats(db, chunk_size=2) == 6
+    assert {row["mode"]: row for row in client.get("/api/users/1/stats").json()["data"]} == stats
+    assert client.get("/api/users/missing/stats").json()["data"] == []
+
+
+def test_shared_usernames_are_not_credited(client, caplog):
+    import main
+
+    with main.SessionLocal() as db:
+        db.add(
+            main.UserModel(
+                id="twin",
+                username="SnakeMaster",
+                email="twin@test.com",
+                password="password123",
+                created_at=main.datetime.now(main.timezone.utc),
+            )
+        )
+        db.commit()
+        caplog.set_level("WARNING", logger="uvicorn.error")
+        written = main.backfill_user_stats(db)
+        stats_users = set(db.execute(main.select(main.UserStatsModel.user_id)).scalars())
+    assert written > 0
+    assert not {"1", "twin"} & stats_users
+    assert "Not backfilling stats of 'SnakeMaster'" in caplog.text
+
+    now = main.datetime.now(main.timezone.utc)
+
+    async def fold_in():
+        async with main.AsyncSessionLocal() as db:
+            return await main.fold_in_imported_scores(db, [("imported", "SnakeMaster", 99999, "walls", now)])
+
+    assert client.portal.call(fold_in) == []
+    assert "Not crediting imported scores of 'SnakeMaster'" in caplog.text
+
+
+def test_windowed_leaderboard_rolls_hour_buckets_up(client):
+    import main
+
+    client.post("/api/auth/login", json={"email": "player2@test.com", "password": "password123"})
+    client.post("/api/scores", json={"score": 400, "mode": "walls"})
+    client.post("/api/scores", json={"score": 300, "mode": "walls"})
+    client.post("/api/auth/login", json={"email": "player3@test.com", "password": "password123"})
+    client.post("/api/scores", json={"score": 500, "mode": "walls"})
+
+    def window(name):
+        body = client.get("/api/leaderboard", params={"mode": "walls", "window": name}).json()
+        return [(entry["username"], entry["score"]) for entry in body["data"]]
+
+    # Seeded history predates the window; each player appears once, with their best.
+    assert window("daily") == [("CobraKai", 500), ("VenomStrike", 400)]
+    assert window("weekly") == window("daily")
+    assert len(window("all-time")) > 2
+
+    deletes = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM leaderboard_buckets"):
+            deletes.append(executemany)
+
+    later = main.datetime.now(main.timezone.utc) + main.timedelta(hours=2)
+    main.event.listen(main.async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        result = client.portal.call(main.compact_leaderboard_buckets, later)
+    finally:
+        main.event.remove(main.async_engine.sync_engine, "before_cursor_execute", record)
+    assert result["rolledUp"] >= 2 and result["expired"] == 0
+    # One statement drops the batch of rolled-up hours; two more expire old days and weeks.
+    assert deletes == [False, False, False]
+    with main.SessionLocal() as db:
+        granularities = db.execute(main.select(main.LeaderboardBucketModel.granularity)).scalars().all()
+    assert sorted(granularities) == ["day", "day", "week", "week"]
+    assert window("daily") == [("CobraKai", 500), ("VenomStrike", 400)]
+
+    # A tie in a newer hour bucket loses to the rolled-up best; pages follow the keyset.
+    client.post("/api/scores", json={"score": 500, "mode": "walls"})
+    first = client.get("/api/leaderboard", params={"mode": "walls", "window": "daily", "limit": 1}).json()
+    assert [entry["username"] for entry in first["data"]] == ["CobraKai"]
+    second = client.get(
+        "/api/leaderboard", params={"mode": "walls", "window": "daily", "limit": 1, "after": first["nextCursor"]}
+    ).json()
+    assert [(entry["username"], entry["score"]) for entry in second["data"]] == [("VenomStrike", 400)]
+    assert second["nextCursor"] is None
+
+    much_later = later + main.timedelta(weeks=10)
+    # Only the hour of the tie is left to roll up.
+    assert client.portal.call(main.compact_leaderboard_buckets, much_later) == {"rolledUp": 1, "expired": 4}
+
+
+async def async_lines(*lines):
+    for line in lines:
+        yield line
+
+
+def test_admin_score_export_and_import_round_trip(client):
+    import main
+
+    assert client.get("/api/admin/scores/export").status_code == 403
+    main.ADMIN_TOKEN = "secret"
+    admin = {"Authorization": "Bearer secret"}
+
+    exported = client.get("/api/admin/scores/export", params={"format": "csv"}, headers=admin)
+    assert exported.status_code == 200
+    assert exported.headers["content-type"].startswith("text/csv")
+    lines = exported.text.splitlines()
+    assert lines[0] == "id,username,score,mode,playedAt"
+    assert len(lines) == 13
+
+    payload = (
+        exported.text
+        + "imported-1,SnakeMaster,9000,walls,2024-06-01T12:00:00Z\r\n"
+        + "imported-2,CobraKai,100,pass-through,2024-06-02T12:00:00+00:00\r\n"
+    )
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    main.event.listen(main.async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        imported = client.post("/api/admin/scores/import", params={"format": "csv"}, content=payload, headers=admin)
+    finally:
+        main.event.remove(main.async_engine.sync_engine, "before_cursor_execute", record)
+    assert imported.json() == {"success": True, "data": {"rows": 14}, "error": None}
+    # High scores of the whole chunk are raised in one statement.
+    assert sum(statement.startswith("UPDATE users") for statement in statements) == 1
+
+    ndjson = client.get("/api/admin/scores/export", headers=admin).text.splitlines()
+    assert len(ndjson) == 14
+    assert '"id":"imported-1"' in "\n".join(ndjson)
+    with main.SessionLocal() as db:
+        assert db.get(main.UserModel, "1").high_score == 9000
+    assert client.get("/api/leaderboard", params={"limit": 1}).json()["data"][0]["id"] == "imported-1"
+    stats = {row["mode"]: row for row in client.get("/api/users/1/stats").json()["data"]}
+    assert stats["walls"]["gamesPlayed"] == 2
+
+    # Only rows actually inserted are credited; a re-run changes nothing.
+    again = client.post("/api/admin/scores/import", params={"format": "csv"}, content=payload, headers=admin)
+    assert again.status_code == 200
+    assert client.get("/api/users/1/stats").json()["data"] == list(stats.values())
+
+    # The CLI resets versions in the database, which other processes poll.
+    import json
+
+    async def import_fresh():
+        played_at = main.datetime.now(main.timezone.utc).isoformat()
+        row = {"id": "imported-3", "username": "Newcomer", "score": 7, "mode": "walls", "playedAt": played_at}
+        records = main.read_records(async_lines(json.dumps(row)), "ndjson", {"walls"})
+        backend = main.DatabaseInvalidationBackend(main.AsyncSessionLocal, poll_interval=0)
+        return await main.import_scores(records, backend=backend), await backend.generation("walls")
+
+    assert client.portal.call(import_fresh) == (1, 1)
+    daily = client.get("/api/leaderboard", params={"mode": "walls", "window": "daily"}).json()["data"]
+    assert [entry["username"] for entry in daily] == ["Newcomer"]
+
+    bad = client.post("/api/admin/scores/import", content='{"id": "x"}\n', headers=admin)
+    assert bad.status_code == 400
+    assert bad.json()["error"].startswith("Line 1:")
+
+
+def test_score_transfer_reads_multiline_csv_and_rejects_fractional_scores():
+    import asyncio
+
+    from score_transfer import encode_header, encode_rows, read_records
+
+    async def read(text, fmt):
+        return [record async for record in read_records(async_lines(*text.split("\n")), fmt, {"walls"})]
+
+    username = 'two\nlines, "quoted"'
+    row = {"id": "a", "username": username, "score": 5, "mode": "walls", "playedAt": "2024-06-01T12:00:00+00:00"}
+    exported = encode_header("csv") + encode_rows([row, {**row, "id": "b", "username": "plain"}], "csv")
+    records = asyncio.run(read(exported.replace("\r\n", "\n"), "csv"))
+    assert [(record["id"], record["username"]) for record in records] == [("a", username), ("b", "plain")]
+
+    with pytest.raises(ValueError, match="Line 2: unterminated"):
+        asyncio.run(read('id,username,score,mode,playedAt\na,"open,5,walls,2024-06-01T12:00:00Z', "csv"))
+    for score in (1.9, "19", True):
+        line = encode_rows([{**row, "score": score}], "ndjson")
+        with pytest.raises(ValueError, match="Line 1: score must be an integer"):
+            asyncio.run(read(line, "ndjson"))
+
+
+def test_id_generator_is_unique_sortable_and_survives_clock_steps():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from ids import IdGenerator, decode
+
+    generators = [IdGenerator(worker_id) for worker_id in (1, 2)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda i: generators[i % 2].next_id(), range(20_000)))
+    assert len(set(ids)) == len(ids)
+    assert {decode(identifier)[1] for identifier in ids} == {1, 2}
+
+    clock = iter([1_800_000_000_000, 1_800_000_000_000, 1_799_999_999_000, 1_800_000_000_001])
+    generator = IdGenerator(7, clock=lambda: next(clock))
+    issued = [generator.next_id() for _ in range(4)]
+    assert issued == sorted(issued)
+    assert len(set(issued)) == 4
+    assert decode(issued[0]) == (1_800_000_000_000, 7, 0)
+    assert decode(issued[2]) == (1_800_000_000_000, 7, 2)
+
+
+def test_worker_ids_are_leased_per_process(client, monkeypatch):
+    import main
+    from ids import decode
+
+    first = main.id_generator.worker_id
+    assert first is not None
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "worker_lease_owner", "other-process")
+        second = client.portal.call(main.claim_worker_id)
+    assert second != first
+    assert client.get("/api/metrics").json()["data"]["ids"]["workerId"] == first
+
+    response = client.post(
+        "/api/auth/signup",
+        json={"email": "ids@test.com", "username": "IdPlayer", "password": "pass"},
+    )
+    assert decode(response.json()["user"]["id"])[1] == first
+
+
+def test_game_batch_matches_live_game_rules():
+    import random
+
+    import numpy as np
+
+    from live_games import LiveGame
+    from snake_engine import DIRECTIONS, NO_TURN, GameBatch, direction_codes
+
+    rng = random.Random(7)
+    batch = GameBatch(capacity=2)
+    for trial in range(50):
+        mode = "walls" if trial % 2 else "pass-through"
+        game = LiveGame(str(trial), "u", mode, "t", random.Random(trial))
+        slot = batch.add(mode, seed=trial)
+        batch.food[slot] = game.food
+        while game.is_playing:
+            direction = rng.choice(DIRECTIONS + (None,) * 6)
+            turns = np.full(batch.capacity, NO_TURN, dtype=np.int8)
+            if direction:
+                game.turn(direction)
+                turns[slot] = direction_codes([direction])[0]
+            game.tick()
+            batch.tick(turns)
+            if game.is_playing:
+                # Food placement is the one rule that differs, so follow the live game's.
+                batch.food[slot] = game.food
+            assert batch.cells(slot) == list(game.body)
+            assert bool(batch.alive[slot]) == game.is_playing
+            assert batch.score[slot] == game.score
+        batch.remove(slot)
+
+
+def test_game_batch_food_depends_only_on_seed():
+    import numpy as np
+
+    from snake_engine import GameBatch
+
+    def food_after(batch, slot, ticks):
+        seen = []
+        for _ in range(ticks):
+            batch.tick(np.full(batch.capacity, -1, dtype=np.int8))
+            seen.append(int(batch.food[slot]))
+        return seen
+
+    alone = GameBatch(capacity=1)
+    alone_slot = alone.add("pass-through", seed=42)
+    crowded = GameBatch(capacity=1)
+    for seed in range(100):
+        crowded.add("walls", seed=seed)
+    crowded_slot = crowded.add("pass-through", seed=42)
+    assert crowded.capacity == 128
+    assert food_after(alone, alone_slot, 50) == food_after(crowded, crowded_slot, 50)
+    assert crowded.alive[:100].sum() == 0
+
+
+def play_replay(mode, seed, ticks):
+    """Steer a snake toward its food for ``ticks`` ticks; return its score and replay turns."""
+    import numpy as np
+
+    from live_games import GRID_SIZE, OPPOSITES
+    from snake_engine import NO_TURN, GameBatch, direction_codes
+
+    batch = GameBatch(capacity=1)
+    slot = batch.add(mode, seed)
+    turns, last_change = [], 0
+    for tick in range(1, ticks + 1):
+        head_y, head_x = divmod(batch.cells(slot)[0], GRID_SIZE)
+        food_y, food_x = divmod(int(batch.food[slot]), GRID_SIZE)
+        current = batch.state(slot)["direction"]
+        wanted = (
+            ("RIGHT" if food_x > head_x else "LEFT")
+            if food_x != head_x
+            else ("DOWN" if food_y > head_y else "UP")
+        )
+        if wanted == OPPOSITES[current]:
+            wanted = "UP" if current in ("LEFT", "RIGHT") else "LEFT"
+        codes = np.full(1, NO_TURN, dtype=np.int8)
+        if wanted != current:
+            turns.append([tick - last_change, wanted])
+            last_change = tick
+            codes[0] = direction_codes([wanted])[0]
+        batch.tick(codes)
+    assert batch.alive[slot]
+    return int(batch.score[slot]), turns
+
+
+def test_replays_are_verified_by_resimulation(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "REPLAY_VERIFY_WORKERS", 2)
+    client.portal.call(main.replay_verifier.stop)
+    login = client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    client.cookies.set("session", login.cookies.get("session"))
+
+    score, turns = play_replay("pass-through", seed=2024, ticks=60)
+    assert score > 0
+    replay = {"seed": 2024, "ticks": 60, "turns": turns}
+    honest = client.post("/api/scores", json={"score": score, "mode": "pass-through", "replay": replay}).json()["data"]
+    inflated = client.post("/api/scores", json={"score": score + 500, "mode": "pass-through", "replay": replay}).json()["data"]
+    too_long = client.post(
+        "/api/scores", json={"score": score, "mode": "walls", "replay": {**replay, "ticks": 5000}}
+    ).json()["data"]
+
+    pending = client.get(f"/api/scores/{honest['id']}/replay").json()["data"]
+    assert pending["status"] == "pending"
+    assert pending["replay"] == replay
+
+    result = client.portal.call(main.replay_verifier.run_once)
+    assert result["verified"] == 1
+    assert result["rejected"] == 2
+    assert result["ticksPerSecond"] > 0
+    assert client.get(f"/api/scores/{honest['id']}/replay").json()["data"]["status"] == "verified"
+    rejected = client.get(f"/api/scores/{inflated['id']}/replay").json()["data"]
+    assert (rejected["status"], rejected["verifiedScore"]) == ("rejected", score)
+    assert client.get(f"/api/scores/{too_long['id']}/replay").json()["data"]["verifiedTicks"] < 5000
+    assert client.get("/api/scores/missing/replay").status_code == 404
+    assert client.get("/api/metrics").json()["data"]["replayVerification"]["runs"] == 1
+
+
+def test_replays_reject_turns_at_tick_zero_and_overlong_games(client):
+    import replays
+
+    login = client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    client.cookies.set("session", login.cookies.get("session"))
+    early = {"seed": 1, "ticks": 10, "turns": [[0, "UP"], [2, "LEFT"]]}
+    endless = {"seed": 1, "ticks": replays.MAX_TICKS + 1, "turns": []}
+    for replay in (early, endless):
+        response = client.post("/api/scores", json={"score": 0, "mode": "pass-through", "replay": replay})
+        assert response.status_code == 422
+
+    # A stacked change on tick 1 is fine; one on tick 0 can only come from a bad blob.
+    assert replays.decode(replays.encode(1, 10, [(1, "UP"), (0, "LEFT")])).turns == [(1, "UP"), (0, "LEFT")]
+    bad = replays.HEADER.pack(replays.VERSION, 1, 10) + bytes([0 << 2 | 1])
+    with pytest.raises(ValueError):
+        replays.decode_codes(bad)
+    results, _ = replays.verify_replays([("walls", bad), ("walls", replays.encode(1, 3, [(1, "UP")]))])
+    assert [result.complete for result in results] == [False, True]
+
+
+def test_expired_sessions_are_rejected_and_swept_in_batches(client, monkeypatch, tmp_path):
+    import sqlite3
+    from datetime import datetime, timedelta, timezone
+
+    import main
+    from sqlalchemy import create_engine, inspect
+
+    login = client.post("/api/auth/login", json={"email": "player1@test.com", "password": "password123"})
+    assert f"Max-Age={int(main.SESSION_TTL)}" in login.headers["set-cookie"]
+    live_token = login.cookies.get("session")
+
+    now = datetime.now(timezone.utc)
+    with main.SessionLocal() as db:
+        for i in range(5):
+            db.add(
+                main.SessionModel(
+                    token=f"old-{i}",
+                    email="player1@test.com",
+                    user_id="1",
+                    created_at=now,
+                    expires_at=now - timedelta(seconds=1),
+                )
+            )
+        # Sessions from before expires_at existed expire SESSION_TTL after creation.
+        expired_created_at = now - timedelta(seconds=main.SESSION_TTL + 1)
+        db.add(main.SessionModel(token="legacy", email="player1@test.com", user_id="1", created_at=expired_created_at))
+        db.commit()
+
+    client.cookies.set("session", "old-0")
+    assert client.get("/api/auth/me").json()["data"] is None
+
+    monkeypatch.setattr(main, "SESSION_SWEEP_BATCH", 2)
+    assert client.portal.call(main.session_sweeper.run_once) == {"deleted": 6, "batches": 3}
+    with main.SessionLocal() as db:
+        assert [session.token for session in db.query(main.SessionModel)] == [live_token]
+    assert client.get("/api/metrics").json()["data"]["sessionSweeper"]["lastResult"]["deleted"] == 6
+
+    legacy_path = tmp_path / "legacy.db"
+    with sqlite3.connect(legacy_path) as legacy:
+        legacy.execute("CREATE TABLE sessions (token VARCHAR PRIMARY KEY, email VARCHAR NOT NULL, created_at DATETIME NOT NULL)")
+    legacy_engine = create_engine(f"sqlite:///{legacy_path}")
+    with legacy_engine.begin() as connection:
+        main.migrate_schema(connection)
+        columns = {column["name"] for column in inspect(connection).get_columns("sessions")}
+        indexes = {index["name"] for index in inspect(connection).get_indexes("sessions")}
+    assert {"user_id", "expires_at"} <= columns
+    assert {"ix_sessions_email", "ix_sessions_expires_at"} <= indexes